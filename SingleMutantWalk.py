@@ -1,92 +1,181 @@
 import shelve
+import contextlib
+import time
 import numpy as np
 import operator
+import itertools
+import heapq
+from functools import cached_property
 import random
+from sklearn.base import clone
 from sklearn.linear_model import LinearRegression
 import matplotlib.pyplot as plt
+import landscapeStore
+from landscapeStore import IndexedLandscape, openLandscape, toIndexedLandscape
+from featureStore import FeatureStore
+from landscapeBasins import getLandscapeBasins
+from activeLearning import sampleCampaigns
+from batchWalk import runSingleWalkBatch
+from batchRecombination import runRecombinationBatch
+from instrumentedLandscape import InstrumentedLandscape
 
 class SingleMutantWalk:
-    def __init__(self, shelveName):
-        self.shelveName = shelveName # stores the name of the shelve
-        self.landscape = shelve.open(shelveName) # all variants with corresponding fitness values
+    def __init__(self, shelveName, landscape=None, aminoAcidDict=None, enumerationSeed=0):
+        self.shelveName = shelveName # stores the name of the shelve, or of a .npy dense or .npz sparse landscape made with landscapeStore
+        if landscape is not None:
+            self.landscape = landscape # an already open landscape, such as one attached from shared memory by parallelSimulation
+        # otherwise self.landscape, all variants with corresponding fitness values, is opened on first use
         # self.screenedVariants, only the screened variants, not the fitted ones, available only on the fittedVariants object
         self.aminoAcids = ["A", "R", "N", "D", "C", "E", "Q", "G", "H", "I", "L", "K", "M", "F", "P", "S", "T", "W", "Y", "V"] # list of amino acid 1 letter codes
-        self.enumerateAminoAcids(random=True) # maps each amino acid to an integer [0, 19] in a dictionary entitied self.aminoAcidDict
-        self.getDataMatrixFromLandscape() # formulates the landscape into a data matrix and solution vector suitable for machine learning algorithms
-        self.maxFitness = max(self.landscape.values()) # the value of the maximum fitness peak
+        if aminoAcidDict is not None:
+            self.aminoAcidDict = dict(aminoAcidDict) # an explicit enumeration, such as the one parallelSimulation hands to its workers
+        else:
+            self.enumerateAminoAcids(randomize=True, rng=np.random.default_rng(enumerationSeed)) # maps each amino acid to an integer [0, 19] in a dictionary entitied self.aminoAcidDict, the same shuffle for a given ENUMERATIONSEED so model results are reproducible
+        # self.siteCount, self.dataMatrix, self.solutionVector, self.maxFitness, self.variantList and self.landscapeSize are computed on first use, see getLandscapeMetadata
         self.maxPeakResults = {"not max": 0, "max": 0} # "not max" represents how many times the single mutant walk did not converge onto the maximum fitness peak
         self.improvementResults = {} # will hold values of variants and the fitness peaks values they converge on in the given landscape
 
 
+    @cached_property
+    def landscape(self):
+        self.open()
+        return self.landscape
+
+    @cached_property
+    def siteCount(self):
+        # number of mutated positions in each variant, 4 for GB1
+        return self.getLandscapeMetadata()["siteCount"]
+
+    @cached_property
+    def dataMatrix(self):
+        # integer encoded variants suitable for machine learning algorithms, one row per variant in landscape order
+        self.getDataMatrixFromLandscape()
+        return self.dataMatrix
+
+    @cached_property
+    def solutionVector(self):
+        # fitness of each data matrix row
+        return self.getLandscapeMetadata()["fitness"]
+
+    @cached_property
+    def maxFitness(self):
+        # the value of the maximum fitness peak
+        return self.getLandscapeMetadata()["maxFitness"]
+
+    @cached_property
+    def variantList(self):
+        # all variants of the landscape in landscape order, for random sampling
+        return landscapeStore.indicesToVariants(self.getVariantIndices(), self.siteCount)
+
+    @cached_property
+    def landscapeSize(self):
+        # number of variants in the landscape
+        return len(self.getVariantIndices())
+
+    def getLandscapeMetadata(self):
+        # variant indices, fitness values and maximum fitness of the landscape, read from the sidecar file saved next to it when up to date
+        try:
+            return self.metadata
+        except AttributeError:
+            pass
+        self.metadata = landscapeStore.getLandscapeMetadata(lambda: self.landscape, self.shelveName) # only opens the landscape if the sidecar is out of date
+        return self.metadata
+
+    def instrument(self, cacheSize=4096):
+        # wraps the landscape so the screening cost and lookup time of every strategy are counted, see instrumentedLandscape.InstrumentedLandscape
+        # the sampling methods then print their unique screens per replicate, repeated lookups and time split, getInstrumentation().getStats() returns them all
+        if self.getInstrumentation() is None:
+            self.landscape = InstrumentedLandscape(self.landscape, cacheSize)
+        return self.landscape
+
+    def getInstrumentation(self):
+        # the InstrumentedLandscape if instrument() was called, without opening the landscape otherwise
+        landscape = self.__dict__.get("landscape")
+        return landscape if isinstance(landscape, InstrumentedLandscape) else None
+
+    def screening(self, strategy):
+        # context of one replicate of STRATEGY, its lookups are memoized and counted when the landscape is instrumented
+        instrumentation = self.getInstrumentation()
+        return contextlib.nullcontext() if instrumentation is None else instrumentation.replicate(strategy)
+
+    def recordScreens(self, screens):
+        # counts SCREENS variants screened by the running replicate without a landscape lookup, such as training sets read from the solution vector
+        instrumentation = self.getInstrumentation()
+        if instrumentation is not None:
+            instrumentation.recordScreens(screens)
+
+    def reportScreening(self, strategy):
+        instrumentation = self.getInstrumentation()
+        if instrumentation is not None:
+            instrumentation.report(strategy)
+
     def runSingleWalk(self, startingVariant):
+        # each round explores every unexplored position, moves to the best variant found and marks its position as explored, for as many rounds as there are sites
         # print("optimizing variant {0}, beginning at fitness {1}".format(startingVariant, self.landscape[startingVariant]))
-        bestVariant0pos, varient0fitness = self.getBestVariant(startingVariant, 0)
-        bestVariant1pos, varient1fitness = self.getBestVariant(startingVariant, 1)
-        bestVariant2pos, varient2fitness = self.getBestVariant(startingVariant, 2)
-        bestVariant3pos, varient3fitness = self.getBestVariant(startingVariant, 3) # explore all positions and find the best variants at each
-        bestVariants1stRound = [bestVariant0pos, bestVariant1pos, bestVariant2pos, bestVariant3pos]
-        bestVariants1stRoundFitness = [varient0fitness, varient1fitness, varient2fitness, varient3fitness]
-        bestVariant1stRound = bestVariants1stRound[bestVariants1stRoundFitness.index(max(bestVariants1stRoundFitness))]
-        # print("{0} was optimized to {1} after the first round, new fitness value is {2}".format(startingVariant, bestVariant1stRound, self.landscape[bestVariant1stRound]))
-        unexplored = [index for index, value in enumerate(bestVariants1stRoundFitness) if value is not max(bestVariants1stRoundFitness)] # all remaining unexplored positions
-        bestVariant0pos2ndRound, varient0fitness2ndRound = self.getBestVariant(bestVariant1stRound, unexplored[0])
-        bestVariant1pos2ndRound, varient1fitness2ndRound = self.getBestVariant(bestVariant1stRound, unexplored[1])
-        bestVariant2pos2ndRound, varient2fitness2ndRound = self.getBestVariant(bestVariant1stRound, unexplored[2])
-        bestVariants2ndRound = [bestVariant0pos2ndRound, bestVariant1pos2ndRound, bestVariant2pos2ndRound]
-        bestVariants2ndRoundFitness = [varient0fitness2ndRound, varient1fitness2ndRound, varient2fitness2ndRound]
-        bestVariant2ndRound = bestVariants2ndRound[bestVariants2ndRoundFitness.index(max(bestVariants2ndRoundFitness))]
-        # print("{0} was optimized to {1} after the second round, new fitness value is {2}".format(bestVariant1stRound, bestVariant2ndRound, self.landscape[bestVariant2ndRound]))
-        unexplored = [index for index, value in enumerate(bestVariants2ndRoundFitness) if value is not max(bestVariants2ndRoundFitness)] # all remaining unexplored positions
-        bestVariant0pos3rdRound, varient0fitness3rdRound = self.getBestVariant(bestVariant2ndRound, unexplored[0])
-        bestVariant1pos3rdRound, varient1fitness3rdRound = self.getBestVariant(bestVariant2ndRound, unexplored[1])
-        bestVariants3rdRound = [bestVariant0pos3rdRound, bestVariant1pos3rdRound]
-        bestVariants3rdRoundFitness = [varient0fitness3rdRound, varient1fitness3rdRound]
-        bestVariant3rdRound = bestVariants3rdRound[bestVariants3rdRoundFitness.index(max(bestVariants3rdRoundFitness))]
-        # print("{0} was optimized to {1} after the third round, new fitness value is {2}".format(bestVariant2ndRound, bestVariant3rdRound, self.landscape[bestVariant3rdRound]))
-        unexplored = [index for index, value in enumerate(bestVariants3rdRoundFitness) if value is not max(bestVariants3rdRoundFitness)] # all remaining unexplored positions
-        bestVariant4thRound, bestVariant4thRoundFitness = self.getBestVariant(bestVariant3rdRound, unexplored[0])
-        # print("{0} was optimized to {1} after the fourth round, final fitness value is {2}".format(bestVariant3rdRound, bestVariant4thRound, self.landscape[bestVariant4thRound]))
-        return bestVariant4thRound, bestVariant4thRoundFitness
-
-    def runRecombination(self, variantList=None):
-        # randomly samples the landscape 489 variants then makes a recombinatorial library from the top 3 variants and returns the best variant out of that library (theoretical maximum size 3^4 = 81 variants)
+        bestVariant, bestVariantFitness = startingVariant, self.landscape[startingVariant]
+        unexplored = list(range(self.siteCount)) # all remaining unexplored positions
+        while unexplored:
+            roundResults = [self.getBestVariant(bestVariant, position) for position in unexplored] # explore all unexplored positions and find the best variants at each
+            roundFitness = [fitness for _, fitness in roundResults]
+            bestIndex = roundFitness.index(max(roundFitness))
+            bestVariant, bestVariantFitness = roundResults[bestIndex]
+            # print("optimized to {0} after round {1}, new fitness value is {2}".format(bestVariant, self.siteCount - len(unexplored) + 1, bestVariantFitness))
+            del unexplored[bestIndex]
+        return bestVariant, bestVariantFitness
+
+    def runRecombination(self, variantList=None, rng=None):
+        # randomly samples the landscape 489 variants then makes a recombinatorial library from the top 3 variants and returns the best variant out of that library (theoretical maximum size 3^L, 81 variants for the 4 site GB1 landscape)
+        # RNG is a numpy Generator for reproducible replicates, the global np.random state is used by default
+        rng = rng or np.random
         sampledLibrary = {} # keep track of the variants and their corresponding fitnesses that we have sampled
         if not variantList:
-            variantList = list(self.landscape.keys()) # list out all possible variants for random sampling
-        for randomVariant in np.random.choice(variantList, 489, replace=False):
-            sampledLibrary[randomVariant] = self.landscape[randomVariant] # keeps track of that variant
-        # now, filter out all the entries in sampledLibrary dict except the top 3 variants
-        firstHighest, secondHighest, thirdHighest = self.findFirstSecondAndThirdHighest(list(sampledLibrary.values())) # get the top 3 variant values
-        filteredDict = filterDict(sampledLibrary, lambda keyValue: keyValue[1] == firstHighest or keyValue[1] == secondHighest or keyValue[1] == thirdHighest)
-        bestVariant, secondBestVariant, thirdBestVariant = list(filteredDict.keys())
-        recombinationVariants = self.findRecombinations(bestVariant, secondBestVariant, thirdBestVariant) # find the recombinatorial library from the top 3 variants
-        return self.getBestVariantFromList(recombinationVariants)
-
-    def sampleRecombination(self, timesToRun):
+            variantList = self.variantList # list out all possible variants for random sampling
+        with self.screening("recombination"):
+            for randomIndex in rng.choice(len(variantList), 489, replace=False): # choosing indices avoids converting the whole variant list to an array every replicate
+                randomVariant = variantList[randomIndex]
+                sampledLibrary[randomVariant] = self.landscape[randomVariant] # keeps track of that variant
+            # now, keep only the top 3 variants, picking by variant rather than by value so tied fitnesses still give exactly three
+            bestVariant, secondBestVariant, thirdBestVariant = heapq.nlargest(3, sampledLibrary, key=sampledLibrary.get)
+            recombinationVariants = self.findRecombinations(bestVariant, secondBestVariant, thirdBestVariant) # find the recombinatorial library from the top 3 variants
+            return self.getBestVariantFromList(recombinationVariants)
+
+    def sampleRecombination(self, timesToRun, rng=None):
         print("Running recombination strategy {0} times".format(timesToRun))
-        # runs the recombination directed evolution strategy the specified number of times
-        peakFittnesses = []
-        variantList = list(self.landscape.keys())
-        counter = 0
-        for _ in range(timesToRun):
-            peakFitness = self.runRecombination(variantList=variantList)[1]
-            peakFittnesses.append(peakFitness)
-            counter += 1
-            if not counter % 100:
-                print("Completed {0} out of {1} recombination simulations".format(counter, timesToRun))
-        return sum(peakFittnesses)/len(peakFittnesses)
+        # runs the recombination directed evolution strategy the specified number of times, all replicates at once, see batchRecombination
+        instrumentation = self.getInstrumentation()
+        screeningCounts = None if instrumentation is None else {}
+        landscape = self.getIndexedLandscape() # copied into memory before timing for a shelve landscape
+        start = time.perf_counter()
+        bestIndices, peakFittnesses = runRecombinationBatch(landscape, timesToRun, rng, screeningCounts=screeningCounts)
+        if instrumentation is not None:
+            instrumentation.recordBatch("recombination", timesToRun, seconds=time.perf_counter() - start, **screeningCounts)
+            instrumentation.report("recombination")
+        return float(peakFittnesses.mean())
         
-    def sampleSingleWalk(self, timesToRun):
+    def runRandomSingleWalk(self, variantList=None, rng=None):
+        # runs a single mutant walk from a random starting variant
+        rng = rng or np.random
+        if not variantList:
+            variantList = self.variantList
+        with self.screening("singleWalk"):
+            return self.runSingleWalk(variantList[rng.choice(len(variantList))])
+
+    def sampleSingleWalk(self, timesToRun, rng=None):
         print("Running single walk strategy {0} times".format(timesToRun))
+        # RNG is a numpy Generator for reproducible replicates, the global np.random state is used by default
+        rng = rng or np.random
         peakFittnesses = []
-        variantList = list(self.landscape.keys())
+        variantList = self.variantList
         counter = 0 # keep count of how many simulations we have completed
-        for variant in np.random.choice(variantList, timesToRun, replace=False):
-            peakFitness = self.runSingleWalk(variant)[1]
+        for randomIndex in rng.choice(len(variantList), timesToRun, replace=False): # choosing indices avoids converting the whole variant list to an array
+            variant = variantList[randomIndex]
+            with self.screening("singleWalk"):
+                peakFitness = self.runSingleWalk(variant)[1]
             peakFittnesses.append(peakFitness)
             counter += 1
             if not counter % 100:
                 print("Completed {0} out of {1} single walk simulations".format(counter, timesToRun))
+        self.reportScreening("singleWalk")
         return sum(peakFittnesses)/len(peakFittnesses)
 
     def getBestVariant(self, startingVariant, position):
@@ -108,8 +197,9 @@ class SingleMutantWalk:
         counter = 0
         for variant in self.landscape.keys():
             self.improvementResults[variant] = {}
-            bestVariantName, bestVariantFitness = self.runSingleWalk(variant)
-            self.improvementResults[variant]["starting fitness"] = self.landscape[variant]
+            with self.screening("singleWalkEntireLandscape"):
+                bestVariantName, bestVariantFitness = self.runSingleWalk(variant)
+                self.improvementResults[variant]["starting fitness"] = self.landscape[variant]
             self.improvementResults[variant]["final fitness"] = bestVariantFitness
             self.improvementResults[variant]["final variant"] = bestVariantName
             if bestVariantFitness == self.maxFitness:
@@ -119,23 +209,63 @@ class SingleMutantWalk:
             counter += 1
             if not counter % 1000:
                 print("completed {0} out of {1} variants".format(counter, len(self.landscape)))
+        self.reportScreening("singleWalkEntireLandscape")
 
-    def getNumberOfPeaks(self):
-        # returns how many unique peaks the single mutant walk on the entire landscape converged to
-        # if we've already calculated this
+    def runSingleWalkEntireLandscapeBatch(self):
+        # runs a single mutation walk for every variant in the landscape at once, giving the same walks as runSingleWalkEntireLandscape, see checkSingleWalkBatch
+        # returns columnar arrays of "starting index", "starting fitness", "final index" and "final fitness", see landscapeStore.indicesToVariants
+        # self.improvementResults and self.maxPeakResults are left alone, batchWalk.getNumberOfPeaks, getAverageFinalFitness and getFractionReachingMax query the returned arrays instead
+        return runSingleWalkBatch(self.getIndexedLandscape())
+
+    def checkSingleWalkBatch(self, startCount=1000, rng=None):
+        # walks from STARTCOUNT random variants, or every variant if None, with both runSingleWalkBatch and runSingleWalk
+        # returns the number of starts where the two end on a different variant or fitness, which should always be 0
+        rng = rng or np.random
+        startIndices = self.getVariantIndices()
+        if startCount is not None and startCount < len(startIndices):
+            startIndices = startIndices[np.sort(rng.choice(len(startIndices), startCount, replace=False))]
+        results = runSingleWalkBatch(self.getIndexedLandscape(), startIndices)
+        mismatches = 0
+        for startIndex, finalIndex, finalFitness in zip(startIndices, results["final index"], results["final fitness"]):
+            finalVariant, fitness = self.runSingleWalk(landscapeStore.indexToVariant(int(startIndex), self.siteCount))
+            if landscapeStore.variantToIndex(finalVariant) != finalIndex or fitness != finalFitness:
+                mismatches += 1
+        return mismatches
+
+    def getIndexedLandscape(self):
+        # returns the landscape as an integer indexed ArrayLandscape or SparseLandscape, copying a shelve landscape into memory the first time
+        landscape = self.landscape
+        if isinstance(landscape, InstrumentedLandscape):
+            landscape = landscape.landscape # the batch paths count their own screens
+        if isinstance(landscape, IndexedLandscape):
+            return landscape
         try:
-            return len(self.uniquePeaks)
+            return self.indexedLandscape
         except AttributeError:
             pass
+        self.indexedLandscape = toIndexedLandscape(landscape)
+        return self.indexedLandscape
+
+    def getNumberOfPeaks(self):
+        # returns how many unique peaks the single mutant walk on the entire landscape converged to
+        # recounted on every call so it follows self.improvementResults
         self.uniquePeaks = {}
         for variant in self.improvementResults.keys():
             finalVariant = self.improvementResults[variant]["final variant"]
-            try:
-                self.uniquePeaks[finalVariant]
-            except KeyError:
-                self.uniquePeaks[finalVariant] = self.improvementResults[variant]["final fitness"]
+            self.uniquePeaks[finalVariant] = self.improvementResults[variant]["final fitness"]
         return len(self.uniquePeaks)
 
+    def getBasins(self):
+        # local optima and steepest ascent basins of attraction of the whole landscape, see landscapeBasins.LandscapeBasins
+        # computed once and saved next to the landscape file, after which peak counts, basin sizes and the fraction reaching maxFitness are instant
+        # these describe a climb that may mutate any position again, not runSingleWalk, which fixes each position once, so they differ from getNumberOfPeaks and maxPeakResults
+        try:
+            return self.basins
+        except AttributeError:
+            pass
+        self.basins = getLandscapeBasins(self.getIndexedLandscape, self.shelveName)
+        return self.basins
+
     def getAverageFinalFitness(self):
         finalValues = [self.improvementResults[variant]["final fitness"] for variant in self.improvementResults.keys()]
         return sum(finalValues)/len(finalValues)
@@ -149,18 +279,9 @@ class SingleMutantWalk:
         return firstHighest, secondHighest, thirdHighest
 
     def findRecombinations(self, firstVariant, secondVariant, thirdVariant):
-        recombinationList = []
-        pos1 = [firstVariant[0], secondVariant[0], thirdVariant[0]]
-        pos2 = [firstVariant[1], secondVariant[1], thirdVariant[1]]
-        pos3 = [firstVariant[2], secondVariant[2], thirdVariant[2]]
-        pos4 = [firstVariant[3], secondVariant[3], thirdVariant[3]]
-        for aa1 in pos1:
-            for aa2 in pos2:
-                for aa3 in pos3:
-                    for aa4 in pos4:
-                        recombinedVariant = aa1 + aa2 + aa3 + aa4
-                        if recombinedVariant not in recombinationList:
-                            recombinationList.append(recombinedVariant)
+        # every variant built by picking each position from one of the three parents, without duplicates
+        positions = [list(dict.fromkeys((firstVariant[position], secondVariant[position], thirdVariant[position]))) for position in range(len(firstVariant))] # distinct parent amino acids at each position, in parent order
+        recombinationList = ["".join(recombinedVariant) for recombinedVariant in itertools.product(*positions)]
         # print(len(recombinationList))
         return recombinationList
 
@@ -186,54 +307,111 @@ class SingleMutantWalk:
     #     variantFitness = self.landscape[randomVariant]
     #     return randomVariant, variantFitness
 
-    def enumerateAminoAcids(self, randomize=False):
+    def enumerateAminoAcids(self, randomize=False, rng=None):
+        # RNG shuffles the order when RANDOMIZE is set, the global np.random state is used by default
         self.aminoAcidDict = {}
         counter = 0
         aminoAcids = self.aminoAcids[:] # make a copy of the list of amino acids
         if randomize:
-            np.random.shuffle(aminoAcids)
-        for aa in self.aminoAcids:
+            (rng or np.random).shuffle(aminoAcids)
+        for aa in aminoAcids:
             self.aminoAcidDict[aa] = counter
             counter += 1
 
     def getDataMatrixFromLandscape(self):
-        # converts the landscape into a data matrix and solution vector
-        self.dataMatrix = []
-        self.solutionVector = []
-        for variant, fitness in self.landscape.items():
-            variantEncoding = [] # list to hold integer values representing the amino acids at each position in this variant
-            for aa in variant: # for each amino acid in this variant
-                variantEncoding.append(self.aminoAcidDict[aa]) # add the integer value associated with that amino acid
-            self.dataMatrix.append(variantEncoding) # add this variant to the data matrix
-            self.solutionVector.append(fitness)
-
-    def sampleLinearRegression(self, trainingSetSize, testingSetSize, timesToRun):
-        # runs the sklearn LinearRegression algorithm on TRAININGSETSIZE training points to predict TRESTINGSETSIZE top variants. Returns the average best variant over TIMESTORUN simulations
+        # converts the landscape into a data matrix of the integers in self.aminoAcidDict and a solution vector, one row per variant in landscape order
+        ordinal = self.getFeatureStore().get("ordinal") # cached amino acid digits in landscapeStore order
+        enumeration = np.array([self.aminoAcidDict[aa] for aa in landscapeStore.aminoAcids], dtype=np.float64) # landscapeStore digit -> this enumeration's integer
+        self.dataMatrix = enumeration[ordinal] # arrays so whole rows can be gathered and predicted at once
+        self.solutionVector = self.getLandscapeMetadata()["fitness"]
+
+    def getVariantIndices(self):
+        # base 20 indices of the landscape variants, in the order of the data matrix rows
+        return self.getLandscapeMetadata()["variantIndices"]
+
+    def getFeatureStore(self):
+        # feature encodings of this landscape, cached on disk next to the landscape file
+        try:
+            return self.featureStore
+        except AttributeError:
+            pass
+        directory = None if self.shelveName is None else self.shelveName + ".features"
+        self.featureStore = FeatureStore(self.getVariantIndices(), self.siteCount, directory)
+        return self.featureStore
+
+    def getFeatures(self, encoding):
+        # returns the "ordinal", "onehot", "pairwise" or "physicochemical" feature matrix of the landscape, rows in landscape order
+        return self.getFeatureStore().get(encoding)
+
+    def runModel(self, model, encoding, trainingSetSize, testingSetSize, variantList=None, rng=None):
+        # one simulation with any sklearn regressor MODEL trained on TRAININGSETSIZE random variants in ENCODING, returns the best variant and its fitness among the top TESTINGSETSIZE predictions
+        rng = rng or np.random
+        if not variantList:
+            variantList = self.variantList
+        features = self.getFeatures(encoding)
+        with self.screening("model"):
+            randomIndeces = rng.choice(self.landscapeSize, trainingSetSize, replace=False)
+            model = clone(model).fit(features[randomIndeces], self.solutionVector[randomIndeces])
+            predictions = model.predict(features) # the memory mapped features are read in place
+            predictions[randomIndeces] = -np.inf
+            topPredictions = np.argpartition(predictions, -testingSetSize)[-testingSetSize:]
+            bestIndex = topPredictions[np.argmax(self.solutionVector[topPredictions])]
+            self.recordScreens(trainingSetSize + testingSetSize) # training and predicted variants are distinct and read from the solution vector
+        return variantList[bestIndex], float(self.solutionVector[bestIndex])
+
+    def sampleLinearRegression(self, trainingSetSize, testingSetSize, timesToRun, rng=None, batchSize=64):
+        # runs linear regression on TRAININGSETSIZE training points to predict TRESTINGSETSIZE top variants. Returns the best fitness found in each of TIMESTORUN simulations
+        # the least squares fits of BATCHSIZE simulations are solved together as one stacked problem, see fitLinearRegressionBatch
+        rng = rng or np.random
         peakFittnesses = []
-        variantList = list(self.landscape.keys())
         counter = 0
-        for _ in range(timesToRun):
-            randomIndeces = np.random.choice(len(self.landscape), trainingSetSize, replace=False)
-            X = []
-            y = []
-            for index in randomIndeces[:trainingSetSize]: # have the model learn on training set of size specified by TRAININGSETSIZE
-                X.append(self.dataMatrix[index])
-                y.append(self.solutionVector[index])
-            reg = LinearRegression().fit(X, y)
-            unexploredIndeces = [index for index in np.arange(len(self.landscape)) if index not in randomIndeces] # all indeces that weren't part of the training data
-            # next line takes a long time to run
-            predictions = { variantList[index] : reg.predict([self.dataMatrix[index]]) for index in unexploredIndeces} # predict the fitness values for the variants at all of the above indeces
-            predictions = { variant : predictedFitness for variant, predictedFitness in sorted(predictions.items(), key=lambda item: item[1])} # sort the list of variant fitness prediction in ascending order of fitness
-            topPredictions = list(predictions.keys())[-testingSetSize:] # take the top TESTINGSIZE number of variants
-            maxVariant, maxFitness = self.getBestVariantFromList(topPredictions)
-            peakFittnesses.append(maxFitness)
-            counter += 1
-            # if not counter % 10:
-            #     print("Completed {0} out of {1} linear regression simulations".format(counter, timesToRun))
+        start = time.perf_counter()
+        while counter < timesToRun:
+            replicates = min(batchSize, timesToRun - counter)
+            randomIndeces = np.array([rng.choice(self.landscapeSize, trainingSetSize, replace=False) for _ in range(replicates)]) # training rows of each simulation
+            predictions = self.fitLinearRegressionBatch(randomIndeces) # predicted fitness of every variant, one column per simulation
+            predictions[randomIndeces, np.arange(replicates)[:, None]] = -np.inf # never pick variants that were already part of the training data
+            topPredictions = np.argpartition(predictions, -testingSetSize, axis=0)[-testingSetSize:] # the top TESTINGSETSIZE variants of each simulation, unordered
+            peakFittnesses += self.solutionVector[topPredictions].max(axis=0).tolist()
+            counter += replicates
+            # print("Completed {0} out of {1} linear regression simulations".format(counter, timesToRun))
+        instrumentation = self.getInstrumentation()
+        if instrumentation is not None: # every simulation screens its distinct training and top predicted variants
+            screens = timesToRun * (trainingSetSize + testingSetSize)
+            instrumentation.recordBatch("linearRegression", timesToRun, screens, screens, 0, time.perf_counter() - start)
+            instrumentation.report("linearRegression")
         # change below afterwards
         # return sum(peakFittnesses)/len(peakFittnesses)
         return peakFittnesses
 
+    def fitLinearRegressionBatch(self, randomIndeces):
+        # fits one ordinary least squares model with intercept per row of training indices RANDOMINDECES, the same model LinearRegression fits
+        # returns the predictions of every model over the whole data matrix, shape (landscape size, number of models)
+        designMatrix = np.hstack([self.dataMatrix, np.ones((len(self.dataMatrix), 1))]) # add an intercept column
+        coefficients = np.linalg.pinv(designMatrix[randomIndeces]) @ self.solutionVector[randomIndeces][:, :, None] # stacked minimum norm least squares solutions
+        return designMatrix @ coefficients[:, :, 0].T
+
+    def runLinearRegression(self, trainingSetSize, testingSetSize, variantList=None, rng=None):
+        # one linear regression simulation, returns the best variant and its fitness among the top TESTINGSETSIZE predictions
+        rng = rng or np.random
+        if not variantList:
+            variantList = self.variantList
+        dataMatrix = self.dataMatrix
+        with self.screening("linearRegression"):
+            randomIndeces = rng.choice(self.landscapeSize, trainingSetSize, replace=False)
+            reg = LinearRegression().fit(dataMatrix[randomIndeces], self.solutionVector[randomIndeces]) # have the model learn on training set of size specified by TRAININGSETSIZE
+            predictions = reg.predict(dataMatrix) # predict the fitness values of every variant in one call
+            predictions[randomIndeces] = -np.inf # never pick variants that were already part of the training data
+            topPredictions = np.argpartition(predictions, -testingSetSize)[-testingSetSize:] # take the top TESTINGSIZE number of variants
+            bestIndex = topPredictions[np.argmax(self.solutionVector[topPredictions])]
+            self.recordScreens(trainingSetSize + testingSetSize)
+        return variantList[bestIndex], float(self.solutionVector[bestIndex])
+
+    def sampleActiveLearning(self, timesToRun, rounds=10, batchSize=100, initialSize=470, acquisition="greedy", encoding="onehot", seed=None):
+        # simulates TIMESTORUN multi round campaigns with a model updated incrementally between rounds, see activeLearning.runCampaign
+        # returns the average best fitness screened after the initial library and after each round
+        return sampleCampaigns(self, timesToRun, seed, rounds=rounds, batchSize=batchSize, initialSize=initialSize, acquisition=acquisition, encoding=encoding).mean(axis=0)
+
     def testLinearRegressionVariance(self):
         # investigates how many times you need to run the linear regression algorithm to be sure of the results
         xData = np.arange(600, 1000, 100) # number of times to run the algorithm
@@ -252,37 +430,52 @@ class SingleMutantWalk:
 
     def testEnumerationOrder(self, timesToRun):
         # tests to see whether the number associated with each amino acid matters in terms of final fitness convergence
-        aminoAcidDict = self.enumerateAminoAcids(randomize=True)
         xData = list(range(timesToRun))
         yData = []
         counter = 0
         for _ in range(timesToRun):
+            self.enumerateAminoAcids(randomize=True) # a new random order every time, unlike the seeded one of the constructor
+            self.getDataMatrixFromLandscape() # re-encode the cached ordinal features with the new enumeration
             yData.append(np.mean(self.sampleLinearRegression(470, 100, 600)))
             counter += 1
             print("finished {0} out of {1} random amino acid enumeration orders".format(counter, timesToRun))
         plt.plot(xData, yData)
         plt.show()
 
-    def randomSample(self, timesToRun):
+    def randomSample(self, timesToRun, rng=None):
         # randomly samples the landscape 570 times and returns the average peak fitness
         peakFittnesses = []
+        variantList = self.variantList
         counter = 0
         for _ in range(timesToRun):
-            randomVariants = np.random.choice(self.landscape, 570, replace=False)
-            fitnesses = [self.landscape[variant] for variant in randomVariants]
-            peakFittnesses.append(max(fitnesses))
+            peakFittnesses.append(self.runRandomSample(variantList=variantList, rng=rng)[1])
             counter += 1
             if not counter % 100:
                 print("Completed {0} out of {1} random sample simulations".format(counter, timesToRun))
+        self.reportScreening("randomSample")
         return sum(peakFittnesses)/len(peakFittnesses)
 
+    def runRandomSample(self, variantList=None, rng=None):
+        # screens 570 random variants and returns the best one and its fitness
+        rng = rng or np.random
+        if not variantList:
+            variantList = self.variantList
+        with self.screening("randomSample"):
+            return self.getBestVariantFromList([variantList[randomIndex] for randomIndex in rng.choice(len(variantList), 570, replace=False)]) # choosing indices avoids converting the whole variant list to an array every replicate
+
     def close(self):
-        # closes the landscape shelve
-        self.landscape.close()
+        # closes the landscape shelve or array
+        if "landscape" in self.__dict__:
+            self.landscape.close()
+        for attribute in ("landscape", "metadata", "basins", "indexedLandscape", "featureStore", "dataMatrix", "solutionVector", "maxFitness", "variantList", "landscapeSize"):
+            self.__dict__.pop(attribute, None) # recomputed from the landscape, or its sidecar file, once it is opened again
 
     def open(self):
-        # opens the landscape shelve
-        self.landscape = shelve.open(self.shelveName)
+        # opens the landscape shelve, or the memory mapped dense (.npy) or sparse (.npz) landscape
+        if self.shelveName.endswith((".npy", ".npz")):
+            self.landscape = openLandscape(self.shelveName)
+        else:
+            self.landscape = shelve.open(self.shelveName)
 
     def sample(self):
         # runs 600 randomly sampled single mutant walk simulations and 600 recombination simluations
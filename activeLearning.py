@@ -0,0 +1,123 @@
+import copy
+import numpy as np
+from scipy import sparse
+
+class RecursiveLeastSquares:
+    # ridge regression with intercept updated in place as screened variants arrive, rather than refit from scratch every round
+    # keeps P = (X^T X + regularization * I)^-1 and applies the Woodbury identity to each new batch, a rank one update for a single variant
+    # P also gives the predictive variance used by the ucb and thompson acquisitions
+    def __init__(self, featureCount, regularization=1e-3):
+        self.precisionInverse = np.eye(featureCount + 1) / regularization # P over the features and the trailing intercept
+        self.coefficients = np.zeros(featureCount + 1) # the last coefficient is the intercept
+        self.sumOfSquares = 0.0 # ridge penalized residual sum of squares, updated alongside the coefficients
+        self.observationCount = 0
+
+    def update(self, X, y):
+        # adds the screened rows X with fitness y to the fit
+        X = appendIntercept(X)
+        residuals = y - X @ self.coefficients
+        PXt = self.precisionInverse @ X.T
+        innovation = np.eye(len(y)) + X @ PXt # I + X P X^T, only as large as the batch
+        gain = np.linalg.solve(innovation, PXt.T).T # P X^T (I + X P X^T)^-1
+        self.coefficients = self.coefficients + gain @ residuals
+        self.precisionInverse = self.precisionInverse - gain @ PXt.T
+        self.sumOfSquares += float(residuals @ np.linalg.solve(innovation, residuals))
+        self.observationCount += len(y)
+
+    def predict(self, X):
+        return X @ self.coefficients[:-1] + self.coefficients[-1]
+
+    def getNoiseVariance(self):
+        return self.sumOfSquares / max(self.observationCount - len(self.coefficients), 1)
+
+    def getPredictiveVariance(self, X):
+        # variance of the predicted mean of each row of X, [x, 1] P [x, 1]^T times the noise variance
+        P = self.precisionInverse
+        quadratic = rowQuadraticForm(X, P[:-1, :-1])
+        return (quadratic + 2 * (X @ P[:-1, -1]) + P[-1, -1]) * self.getNoiseVariance()
+
+    def sampleCoefficients(self, rng):
+        # coefficients drawn from the Gaussian posterior, for thompson sampling
+        covariance = self.precisionInverse * self.getNoiseVariance()
+        return rng.multivariate_normal(self.coefficients, covariance, method="cholesky")
+
+class PartialFitModel:
+    # adapts an sklearn regressor with partial_fit, such as SGDRegressor, so it is updated with each new batch rather than refit
+    # it gives no predictive variance, so only the greedy acquisition can use it
+    def __init__(self, estimator):
+        self.estimator = estimator
+
+    def update(self, X, y):
+        self.estimator.partial_fit(X, y)
+
+    def predict(self, X):
+        return self.estimator.predict(X)
+
+def appendIntercept(X):
+    if sparse.issparse(X):
+        return sparse.hstack([X, np.ones((X.shape[0], 1))]).toarray()
+    return np.hstack([X, np.ones((X.shape[0], 1))])
+
+def rowQuadraticForm(X, matrix, memoryLimit=2 ** 26):
+    # x^T MATRIX x for every row x of the dense or sparse matrix X
+    # X @ MATRIX is dense, so rows are taken in chunks keeping it to about MEMORYLIMIT bytes, rather than one (rows, features) array the size of the landscape
+    chunkSize = max(1, memoryLimit // (8 * max(matrix.shape[1], 1)))
+    quadratic = np.empty(X.shape[0])
+    for start in range(0, X.shape[0], chunkSize):
+        chunk = X[start:start + chunkSize]
+        XM = chunk @ matrix
+        if sparse.issparse(chunk):
+            quadratic[start:start + chunkSize] = np.asarray(chunk.multiply(XM).sum(axis=1)).ravel()
+        else:
+            quadratic[start:start + chunkSize] = np.einsum("ij,ij->i", XM, chunk)
+    return quadratic
+
+def greedy(model, X, rng):
+    # screen the variants with the highest predicted fitness
+    return model.predict(X)
+
+def ucb(model, X, rng, exploration=2.0):
+    # upper confidence bound, predicted fitness plus EXPLORATION predictive standard deviations
+    return model.predict(X) + exploration * np.sqrt(np.maximum(model.getPredictiveVariance(X), 0))
+
+def thompson(model, X, rng):
+    # score with one draw of the coefficients from their posterior
+    coefficients = model.sampleCoefficients(rng)
+    return X @ coefficients[:-1] + coefficients[-1]
+
+acquisitions = {"greedy": greedy, "ucb": ucb, "thompson": thompson} # any function (model, candidate features, rng) -> scores can be passed instead
+acquisitionRequirements = {"ucb": "getPredictiveVariance", "thompson": "sampleCoefficients"} # model method each acquisition needs beyond predict
+
+def runCampaign(walk, rounds=10, batchSize=100, initialSize=470, acquisition="greedy", encoding="onehot", model=None, rng=None):
+    # simulates a multi round machine learning guided evolution campaign on the landscape of the SingleMutantWalk WALK
+    # screens INITIALSIZE random variants, then every round fits the model incrementally on the newly screened variants and screens the BATCHSIZE unscreened variants scoring highest under ACQUISITION
+    # MODEL defaults to a RecursiveLeastSquares over the ENCODING features, see SingleMutantWalk.getFeatures
+    # returns the best fitness screened so far after the initial library and after each round
+    rng = rng or np.random.default_rng()
+    acquire = acquisitions[acquisition] if isinstance(acquisition, str) else acquisition
+    requirement = acquisitionRequirements.get(acquisition) if isinstance(acquisition, str) else None
+    if model is not None and requirement is not None and not hasattr(model, requirement):
+        raise ValueError("the {0} acquisition needs a model with {1}, such as RecursiveLeastSquares, and {2} has none".format(acquisition, requirement, type(model).__name__))
+    features = walk.getFeatures(encoding)
+    fitness = walk.solutionVector
+    model = model or RecursiveLeastSquares(features.shape[1])
+    unscreened = np.ones(len(fitness), dtype=bool)
+    batch = rng.choice(len(fitness), initialSize, replace=False)
+    bestFitness = []
+    for _ in range(rounds + 1):
+        unscreened[batch] = False
+        model.update(features[batch], fitness[batch])
+        bestFitness.append(float(fitness[~unscreened].max()))
+        if len(bestFitness) > rounds:
+            break
+        candidates = np.flatnonzero(unscreened) # already screened variants are never scored again
+        scores = acquire(model, features[candidates], rng)
+        batch = candidates[np.argpartition(scores, -batchSize)[-batchSize:]]
+    return bestFitness
+
+def sampleCampaigns(walk, timesToRun, seed=None, **campaignArgs):
+    # runs TIMESTORUN independent campaigns, see runCampaign, returns their best fitness per round as rows of an array
+    # campaign i draws from the i-th child of SEED, as the replicates of parallelSimulation do
+    # a MODEL passed in campaignArgs is copied for every campaign, so each one starts from its untouched state
+    model = campaignArgs.pop("model", None)
+    return np.array([runCampaign(walk, rng=np.random.default_rng(seedSequence), model=copy.deepcopy(model), **campaignArgs) for seedSequence in np.random.SeedSequence(seed).spawn(timesToRun)])
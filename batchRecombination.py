@@ -0,0 +1,56 @@
+import itertools
+import numpy as np
+from landscapeStore import aminoAcids
+
+def sampleWithoutReplacement(rng, populationSize, sampleSize, replicates):
+    # RNG.choice(POPULATIONSIZE, SAMPLESIZE, replace=False) for REPLICATES replicates at once, as rows of an integer array
+    # Floyd's algorithm run across all rows together, costs O(SAMPLESIZE^2) per replicate however large the population
+    sample = np.empty((replicates, sampleSize), dtype=np.int64)
+    for column, upperBound in enumerate(range(populationSize - sampleSize, populationSize)):
+        candidates = (rng.random(replicates) * (upperBound + 1)).astype(np.int64) # uniform in [0, upperBound]
+        alreadySampled = (sample[:, :column] == candidates[:, None]).any(axis=1)
+        sample[:, column] = np.where(alreadySampled, upperBound, candidates)
+    return sample
+
+def countScreens(indices, fitness, screeningCounts):
+    # adds the lookups, distinct screened variants and distinct unscreened variants of every row of INDICES to the SCREENINGCOUNTS dictionary
+    order = np.argsort(indices, axis=1)
+    sortedIndices = np.take_along_axis(indices, order, axis=1)
+    unscreenedVariants = np.isnan(np.take_along_axis(fitness, order, axis=1))
+    distinct = np.ones(indices.shape, dtype=bool)
+    distinct[:, 1:] = sortedIndices[:, 1:] != sortedIndices[:, :-1] # first occurrence of each variant in its row
+    screeningCounts["lookups"] = screeningCounts.get("lookups", 0) + indices.size
+    screeningCounts["screens"] = screeningCounts.get("screens", 0) + int(np.count_nonzero(distinct & ~unscreenedVariants))
+    screeningCounts["missing"] = screeningCounts.get("missing", 0) + int(np.count_nonzero(distinct & unscreenedVariants))
+
+def runRecombinationBatch(landscape, replicates, rng=None, sampleSize=489, parentCount=3, memoryLimit=2 ** 26, screeningCounts=None):
+    # runs REPLICATES replicates of SingleMutantWalk.runRecombination at once on an ArrayLandscape or SparseLandscape
+    # each replicate screens SAMPLESIZE random variants, recombines the PARENTCOUNT fittest of them into a PARENTCOUNT^L library and keeps its best variant
+    # replicates are processed in chunks so no intermediate array holds more than about MEMORYLIMIT bytes
+    # returns the base 20 index and fitness of the best variant of every replicate
+    # if SCREENINGCOUNTS is a dictionary the lookups, unique screens and unscreened variants of all replicates are added to it, see countScreens
+    rng = rng or np.random
+    variantIndices = np.asarray(landscape.screenedIndices, dtype=np.int64)
+    strides = len(aminoAcids) ** np.arange(landscape.siteCount - 1, -1, -1, dtype=np.int64)
+    parentChoices = np.array(list(itertools.product(range(parentCount), repeat=landscape.siteCount))) # which parent each position comes from, one row per recombinant
+    positions = np.arange(landscape.siteCount)
+    chunkSize = max(1, memoryLimit // (8 * max(sampleSize, len(parentChoices) * landscape.siteCount)))
+    bestIndices = np.empty(replicates, dtype=np.int64)
+    bestFitness = np.empty(replicates)
+    for start in range(0, replicates, chunkSize):
+        count = min(chunkSize, replicates - start)
+        sampled = variantIndices[sampleWithoutReplacement(rng, len(variantIndices), sampleSize, count)] # (replicates, sampleSize)
+        sampledFitness = landscape.lookupIndices(sampled)
+        top = np.argpartition(sampledFitness, sampleSize - parentCount, axis=1)[:, sampleSize - parentCount:] # the fittest parents, ties broken arbitrarily
+        parents = np.take_along_axis(sampled, top, axis=1)
+        parentDigits = (parents[:, :, None] // strides) % len(aminoAcids) # (replicates, parents, positions)
+        recombinants = parentDigits[:, parentChoices, positions] @ strides # (replicates, recombinants), duplicates do not change the maximum
+        recombinantFitness = landscape.lookupIndices(recombinants)
+        if screeningCounts is not None:
+            countScreens(np.hstack([sampled, recombinants]), np.hstack([sampledFitness, recombinantFitness]), screeningCounts)
+        recombinantFitness[np.isnan(recombinantFitness)] = -1 # unscreened recombinants are never the best, as in getBestVariantFromList
+        best = recombinantFitness.argmax(axis=1)
+        rows = np.arange(count)
+        bestIndices[start:start + count] = recombinants[rows, best]
+        bestFitness[start:start + count] = recombinantFitness[rows, best]
+    return bestIndices, bestFitness
@@ -0,0 +1,60 @@
+import numpy as np
+from landscapeStore import aminoAcids
+
+def runSingleWalkBatch(landscape, startIndices=None, chunkSize=200000):
+    # runs the single mutant walk of SingleMutantWalk.runSingleWalk from every start at once, advancing all walks one round at a time
+    # LANDSCAPE is an ArrayLandscape or SparseLandscape, STARTINDICES defaults to every screened variant
+    # walks are advanced CHUNKSIZE starts at a time so memory stays bounded on landscapes with many sites
+    # returns columnar arrays of the starting and final variant indices and fitnesses, in the order of STARTINDICES
+    if startIndices is None:
+        startIndices = landscape.screenedIndices
+    startIndices = np.asarray(startIndices, dtype=np.int64)
+    finalIndices = np.empty_like(startIndices)
+    finalFitness = np.empty(len(startIndices))
+    for chunkStart in range(0, len(startIndices), chunkSize):
+        chunk = slice(chunkStart, chunkStart + chunkSize)
+        finalIndices[chunk], finalFitness[chunk] = walkChunk(landscape, startIndices[chunk])
+    return {
+        "starting index": startIndices,
+        "starting fitness": landscape.lookupIndices(startIndices),
+        "final index": finalIndices,
+        "final fitness": finalFitness,
+    }
+
+def getNumberOfPeaks(results):
+    # number of distinct variants the walks of RESULTS, as returned by runSingleWalkBatch, ended on
+    return len(np.unique(results["final index"]))
+
+def getAverageFinalFitness(results):
+    return float(results["final fitness"].mean())
+
+def getFractionReachingMax(results, maxFitness):
+    # fraction of the walks of RESULTS ending on a variant of fitness MAXFITNESS
+    return float(np.mean(results["final fitness"] == maxFitness))
+
+def walkChunk(landscape, startIndices):
+    # advances the walks from STARTINDICES through all rounds, returns their final indices and fitnesses
+    siteCount = landscape.siteCount
+    strides = len(aminoAcids) ** np.arange(siteCount - 1, -1, -1, dtype=np.int64) # index step of a mutation at each position
+    mutations = np.arange(len(aminoAcids), dtype=np.int64)
+    walks = np.arange(len(startIndices))
+    currentIndices = startIndices.copy()
+    currentFitness = landscape.lookupIndices(currentIndices)
+    unexplored = np.ones((len(startIndices), siteCount), dtype=bool) # positions each walk has not fixed yet
+    for _ in range(siteCount):
+        roundFitness = np.full(unexplored.shape, -np.inf) # best fitness found at each position this round, -inf on explored positions
+        roundIndices = np.zeros(unexplored.shape, dtype=np.int64) # variant reaching that fitness
+        for position in range(siteCount):
+            rows = np.flatnonzero(unexplored[:, position])
+            digits = (currentIndices[rows] // strides[position]) % len(aminoAcids)
+            candidates = (currentIndices[rows] - digits * strides[position])[:, None] + mutations * strides[position] # all 20 amino acids at this position
+            candidateFitness = landscape.lookupIndices(candidates)
+            candidateFitness[np.isnan(candidateFitness)] = -1 # unscreened variants are never chosen, as in getBestVariant
+            best = candidateFitness.argmax(axis=1) # first best amino acid, matching max() over the amino acid order
+            roundFitness[rows, position] = candidateFitness[np.arange(len(rows)), best]
+            roundIndices[rows, position] = candidates[np.arange(len(rows)), best]
+        chosen = roundFitness.argmax(axis=1) # first best unexplored position, matching list.index(max())
+        currentIndices = roundIndices[walks, chosen]
+        currentFitness = roundFitness[walks, chosen]
+        unexplored[walks, chosen] = False
+    return currentIndices, currentFitness
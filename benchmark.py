@@ -0,0 +1,128 @@
+import argparse
+import contextlib
+import io
+import json
+import os
+import platform
+import subprocess
+import tempfile
+import time
+import tracemalloc
+import numpy as np
+from SingleMutantWalk import SingleMutantWalk
+from syntheticLandscape import makeNKLandscape, makeAdditiveLandscape
+
+# measures throughput, peak memory and startup time of every strategy on seeded synthetic landscapes, or on a real landscape file
+# results are written as JSON tagged with the git commit so runs can be compared between commits, e.g.
+#     python benchmark.py --sites 3 4 --output bench.json
+
+def measure(function, setup=None):
+    # runs FUNCTION twice with its progress prints silenced, returns the result and seconds of the first run and the peak bytes numpy and python allocated in the second
+    # only the second run is traced, tracemalloc slows python loops far more than numpy code and would skew the timings between strategies
+    # SETUP, if given, is called before each run
+    with contextlib.redirect_stdout(io.StringIO()):
+        if setup:
+            setup()
+        start = time.perf_counter()
+        result = function()
+        seconds = time.perf_counter() - start
+        if setup:
+            setup()
+        tracemalloc.start()
+        function()
+        peakMemory = tracemalloc.get_traced_memory()[1]
+        tracemalloc.stop()
+    return result, seconds, peakMemory
+
+def getBenchmarks(walk, replicates, loopVariantLimit):
+    # the strategies to time as (name, replicates run, function), every function runs all of its replicates
+    rng = np.random.default_rng(0)
+    variantList = walk.variantList
+    benchmarks = [
+        ("runSingleWalk", replicates, lambda: [walk.runRandomSingleWalk(variantList, rng) for _ in range(replicates)]),
+        ("runRecombination", replicates, lambda: [walk.runRecombination(variantList, rng) for _ in range(replicates)]),
+        ("sampleRecombination", replicates, lambda: walk.sampleRecombination(replicates, rng)),
+        ("randomSample", replicates, lambda: [walk.runRandomSample(variantList, rng) for _ in range(replicates)]),
+        ("sampleLinearRegression", replicates, lambda: walk.sampleLinearRegression(470, 100, replicates, rng)),
+        ("runSingleWalkEntireLandscapeBatch", walk.landscapeSize, walk.runSingleWalkEntireLandscapeBatch),
+    ]
+    if walk.landscapeSize <= loopVariantLimit: # the one walk at a time version is only practical on small landscapes
+        benchmarks.append(("runSingleWalkEntireLandscape", walk.landscapeSize, walk.runSingleWalkEntireLandscape))
+    return benchmarks
+
+def benchmarkLandscape(fileName, description, replicates, loopVariantLimit):
+    # times startup then every strategy on the landscape saved at FILENAME
+    results = []
+    def removeSidecar():
+        if os.path.exists(fileName + ".meta.npz"):
+            os.remove(fileName + ".meta.npz") # so the startup is a true cold start
+    def startWalk():
+        walk = SingleMutantWalk(fileName)
+        walk.maxFitness, walk.landscapeSize, walk.variantList # first use, which reads the sidecar or builds it
+        return walk
+    for startup, setup in (("cold", removeSidecar), ("warm", None)): # cold builds the metadata sidecar, warm reuses it
+        walk, seconds, peakMemory = measure(startWalk, setup)
+        results.append({"landscape": description, "benchmark": "startup " + startup, "seconds": seconds, "peakMemoryBytes": peakMemory})
+    mismatches = walk.checkSingleWalkBatch(1000, np.random.default_rng(0)) # the batch walk is only worth timing while it gives the same walks as runSingleWalk
+    if mismatches:
+        raise RuntimeError("{0}: runSingleWalkBatch and runSingleWalk disagree on {1} of 1000 starts".format(description["name"], mismatches))
+    for name, replicatesRun, function in getBenchmarks(walk, replicates, loopVariantLimit):
+        _, seconds, peakMemory = measure(function)
+        results.append({"landscape": description, "benchmark": name, "replicates": replicatesRun, "seconds": seconds, "replicatesPerSecond": replicatesRun / seconds if seconds else None, "peakMemoryBytes": peakMemory})
+        print("{0} {1}: {2:.3f} s, {3:.1f} replicates/s, {4:.1f} MB peak".format(description["name"], name, seconds, replicatesRun / seconds if seconds else float("inf"), peakMemory / 2 ** 20))
+    return results
+
+def getCommit():
+    try:
+        return subprocess.run(["git", "rev-parse", "HEAD"], capture_output=True, text=True, check=True, cwd=os.path.dirname(os.path.abspath(__file__))).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+def main():
+    parser = argparse.ArgumentParser(description="benchmark the directed evolution strategies")
+    parser.add_argument("--sites", type=int, nargs="+", default=[3, 4], help="site counts of the synthetic landscapes, dense up to 5 sites")
+    parser.add_argument("--sparse-sites", type=int, nargs="*", default=[], help="site counts of sparse synthetic landscapes of --sparse-variants variants")
+    parser.add_argument("--sparse-variants", type=int, default=200000)
+    parser.add_argument("--model", choices=["nk", "additive"], default="nk", help="synthetic landscape generator")
+    parser.add_argument("--interactions", type=int, default=1, help="K of the NK landscapes")
+    parser.add_argument("--epistasis", type=float, default=0.5, help="pairwise effect scale of the additive landscapes")
+    parser.add_argument("--screened-fraction", type=float, default=0.93, help="fraction of variants with a fitness, GB1 has about 0.93")
+    parser.add_argument("--landscape", action="append", default=[], help="also benchmark an existing shelve, .npy or .npz landscape")
+    parser.add_argument("--replicates", type=int, default=100)
+    parser.add_argument("--loop-variant-limit", type=int, default=20000, help="largest landscape runSingleWalkEntireLandscape is timed on")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--output", default="benchmark.json")
+    args = parser.parse_args()
+    if min(args.sites + args.sparse_sites) < 3 or args.sparse_variants < 570:
+        parser.error("the strategies screen up to 570 variants, so landscapes need at least 3 sites and --sparse-variants of at least 570")
+
+    results = []
+    with tempfile.TemporaryDirectory() as directory:
+        configurations = [(siteCount, None) for siteCount in args.sites] + [(siteCount, args.sparse_variants) for siteCount in args.sparse_sites]
+        for siteCount, variantCount in configurations:
+            if args.model == "nk":
+                landscape = makeNKLandscape(siteCount, min(args.interactions, siteCount - 1), args.seed, args.screened_fraction, variantCount)
+            else:
+                landscape = makeAdditiveLandscape(siteCount, args.epistasis, args.seed, args.screened_fraction, variantCount)
+            fileName = os.path.join(directory, "{0}{1}{2}".format(args.model, siteCount, ".npy" if variantCount is None else ".npz"))
+            landscape.save(fileName)
+            description = {"name": os.path.basename(fileName), "model": args.model, "siteCount": siteCount, "variants": len(landscape), "sparse": variantCount is not None, "seed": args.seed}
+            results += benchmarkLandscape(fileName, description, args.replicates, args.loop_variant_limit)
+        for fileName in args.landscape:
+            results += benchmarkLandscape(fileName, {"name": fileName}, args.replicates, args.loop_variant_limit)
+
+    report = {
+        "commit": getCommit(),
+        "time": time.strftime("%Y-%m-%dT%H:%M:%S%z"),
+        "python": platform.python_version(),
+        "numpy": np.__version__,
+        "machine": platform.machine(),
+        "arguments": vars(args),
+        "results": results,
+    }
+    with open(args.output, "w") as outputFile:
+        json.dump(report, outputFile, indent=2)
+    print("wrote {0}".format(args.output))
+
+if __name__ == "__main__":
+    main()
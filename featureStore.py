@@ -0,0 +1,135 @@
+import os
+import numpy as np
+from scipy import sparse
+from landscapeStore import aminoAcids
+
+# per amino acid properties for the physicochemical encoding, in the order of landscapeStore.aminoAcids
+# Kyte-Doolittle hydropathy, side chain volume (cubic angstroms), charge at pH 7, Grantham polarity
+physicochemicalProperties = np.array([
+    [1.8, 88.6, 0, 8.1], # A
+    [-4.5, 173.4, 1, 10.5], # R
+    [-3.5, 114.1, 0, 11.6], # N
+    [-3.5, 111.1, -1, 13.0], # D
+    [2.5, 108.5, 0, 5.5], # C
+    [-3.5, 138.4, -1, 12.3], # E
+    [-3.5, 143.8, 0, 10.5], # Q
+    [-0.4, 60.1, 0, 9.0], # G
+    [-3.2, 153.2, 0, 10.4], # H
+    [4.5, 166.7, 0, 5.2], # I
+    [3.8, 166.7, 0, 4.9], # L
+    [-3.9, 168.6, 1, 11.3], # K
+    [1.9, 162.9, 0, 5.7], # M
+    [2.8, 189.9, 0, 5.2], # F
+    [-1.6, 112.7, 0, 8.0], # P
+    [-0.8, 89.0, 0, 9.2], # S
+    [-0.7, 116.1, 0, 8.6], # T
+    [-0.9, 227.8, 0, 5.4], # W
+    [-1.3, 193.6, 0, 6.2], # Y
+    [4.2, 140.0, 0, 5.9], # V
+], dtype=np.float32)
+
+encodings = ("ordinal", "onehot", "pairwise", "physicochemical") # encodings FeatureStore.get() can build
+
+class FeatureStore:
+    # computes feature encodings of the variants of one landscape once and keeps them as memory mapped .npy files in DIRECTORY
+    # rows follow VARIANTINDICES, the base 20 indices of the landscape variants in the order of the solution vector
+    # ordinal and physicochemical are dense matrices, onehot and pairwise are CSR matrices over memory mapped column indices
+    # with DIRECTORY set to None the features are computed in memory and not cached
+    def __init__(self, variantIndices, siteCount, directory=None, chunkSize=1000000):
+        self.variantIndices = np.asarray(variantIndices, dtype=np.int64)
+        self.siteCount = siteCount # number of mutated positions in each variant
+        self.directory = directory
+        self.chunkSize = chunkSize # variants encoded at a time, bounds memory while building the files
+        self.features = {} # encodings already opened by this store
+        if directory is not None:
+            self.checkRows()
+
+    def checkRows(self):
+        # drops every cached encoding if the landscape variants changed since they were written
+        os.makedirs(self.directory, exist_ok=True)
+        rowsFile = os.path.join(self.directory, "rows.npy")
+        if os.path.exists(rowsFile) and np.array_equal(np.load(rowsFile, mmap_mode="r"), self.variantIndices):
+            return
+        for fileName in os.listdir(self.directory):
+            if fileName.endswith(".npy"):
+                os.remove(os.path.join(self.directory, fileName))
+        self.saveArray(rowsFile, self.variantIndices)
+
+    def get(self, encoding):
+        # returns the ENCODING feature matrix, building and caching it on first use
+        if encoding not in encodings:
+            raise ValueError("unknown encoding {0}, expected one of {1}".format(encoding, encodings))
+        if encoding not in self.features:
+            array = self.loadOrBuild(encoding)
+            if encoding in ("onehot", "pairwise"):
+                array = self.toSparse(array, encoding)
+            self.features[encoding] = array
+        return self.features[encoding]
+
+    def getColumnCount(self, encoding):
+        pairCount = self.siteCount * (self.siteCount - 1) // 2
+        return {
+            "ordinal": self.siteCount,
+            "onehot": self.siteCount * len(aminoAcids),
+            "pairwise": self.siteCount * len(aminoAcids) + pairCount * len(aminoAcids) ** 2,
+            "physicochemical": self.siteCount * physicochemicalProperties.shape[1],
+        }[encoding]
+
+    def getRowWidth(self, encoding):
+        # number of stored values per variant: columns for the dense encodings, non zero columns for the sparse ones
+        return {
+            "ordinal": self.siteCount,
+            "onehot": self.siteCount,
+            "pairwise": self.siteCount + self.siteCount * (self.siteCount - 1) // 2,
+            "physicochemical": self.siteCount * physicochemicalProperties.shape[1],
+        }[encoding]
+
+    def loadOrBuild(self, encoding):
+        dtype = {"ordinal": np.uint8, "onehot": np.int32, "pairwise": np.int32, "physicochemical": np.float32}[encoding]
+        shape = (len(self.variantIndices), self.getRowWidth(encoding))
+        if self.directory is None:
+            array = np.empty(shape, dtype=dtype)
+            self.fill(array, encoding)
+            return array
+        fileName = os.path.join(self.directory, encoding + ".npy")
+        if not os.path.exists(fileName):
+            temporaryName = fileName + ".tmp"
+            array = np.lib.format.open_memmap(temporaryName, mode="w+", dtype=dtype, shape=shape)
+            self.fill(array, encoding)
+            array.flush()
+            del array
+            os.replace(temporaryName, fileName) # only complete files are ever seen under the final name
+        return np.load(fileName, mmap_mode="r")
+
+    def fill(self, array, encoding):
+        # encodes the variants chunk by chunk into ARRAY
+        strides = len(aminoAcids) ** np.arange(self.siteCount - 1, -1, -1, dtype=np.int64)
+        for start in range(0, len(self.variantIndices), self.chunkSize):
+            digits = (self.variantIndices[start:start + self.chunkSize, None] // strides) % len(aminoAcids) # amino acid digit at each position
+            array[start:start + self.chunkSize] = self.encodeDigits(digits, encoding)
+
+    def encodeDigits(self, digits, encoding):
+        if encoding == "ordinal":
+            return digits
+        if encoding == "physicochemical":
+            return physicochemicalProperties[digits].reshape(len(digits), -1)
+        columns = [digits + len(aminoAcids) * np.arange(self.siteCount)] # one hot column of each position
+        if encoding == "pairwise":
+            offset = self.siteCount * len(aminoAcids)
+            for first in range(self.siteCount):
+                for second in range(first + 1, self.siteCount):
+                    columns.append((offset + digits[:, first] * len(aminoAcids) + digits[:, second])[:, None]) # one hot column of the amino acid pair at these two positions
+                    offset += len(aminoAcids) ** 2
+        return np.hstack(columns)
+
+    def toSparse(self, columnIndices, encoding):
+        # wraps the stored column indices in a CSR matrix of ones without copying them
+        rowCount, rowWidth = columnIndices.shape
+        data = np.ones(rowCount * rowWidth, dtype=np.uint8)
+        indptr = np.arange(0, rowCount * rowWidth + 1, rowWidth, dtype=np.int32 if rowCount * rowWidth < 2 ** 31 else np.int64)
+        return sparse.csr_matrix((data, columnIndices.reshape(-1), indptr), shape=(rowCount, self.getColumnCount(encoding)), copy=False)
+
+    def saveArray(self, fileName, array):
+        temporaryName = fileName + ".tmp.npy"
+        np.save(temporaryName, array)
+        os.replace(temporaryName, fileName)
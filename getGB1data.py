@@ -1,41 +1,15 @@
-import shelve
-import pandas as pd
+import landscapeStore
+from importLandscape import importLandscape
 
-print("reading excels")
+# streams the screened and imputed GB1 fitness tables into the dense landscape GB1dataset_fitted.npy
+# screened fitness takes precedence over imputed fitness, GB1dataset_fitted.provenance.npy records which one each variant holds
+# rerun after an interruption to resume where the import stopped
 
-screenedVariants_df = pd.read_excel("GB1screenedvariants.xlsx")
-fittedVariants_df = pd.read_excel("GB1fittedvariants.xlsx")
+print("importing GB1 variants")
 
-print("converting excel columns to lists")
-
-screenedVariants_list = list(screenedVariants_df.to_dict()["Variants"].values())
-fittedVariants_list = list(fittedVariants_df.to_dict()["Variants"].values())
-
-screenedVariants_fitesses = list(screenedVariants_df.to_dict()["Fitness"].values())
-fittedVariants_fitnesses = list(fittedVariants_df.to_dict()["Imputed fitness"].values())
-
-GB1dataset_fitted = shelve.open("GB1dataset_fitted")
-
-print("collecting screened variant data")
-screenedCount = 0
-screenedTotal = len(screenedVariants_list)
-
-for screenedVariant, fitness in zip(screenedVariants_list, screenedVariants_fitesses):
-    GB1dataset_fitted[screenedVariant] = fitness
-    screenedCount += 1
-    if not screenedCount % 1000:
-        print('finished {0} of the {1} screened variants'.format(screenedCount, screenedTotal))
-
-print("collecting fitted variant data")
-fittedCount = 0
-fittedTotal = len(fittedVariants_list)
-
-for fittedVariant, fitness in zip(fittedVariants_list, fittedVariants_fitnesses):
-    GB1dataset_fitted[fittedVariant] = fitness
-    fittedCount += 1
-    if not fittedCount % 1000:
-        print('finished {0} of the {1} fitted variants'.format(fittedCount, fittedTotal))
-
-GB1dataset_fitted.close()
+importLandscape("GB1dataset_fitted.npy", [
+    ("GB1screenedvariants.xlsx", "Variants", "Fitness", landscapeStore.screened),
+    ("GB1fittedvariants.xlsx", "Variants", "Imputed fitness", landscapeStore.imputed),
+])
 
 print("done")
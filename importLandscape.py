@@ -0,0 +1,105 @@
+import csv
+import json
+import os
+import numpy as np
+from landscapeStore import aminoAcids, variantsToIndices, getProvenanceName, unscreened, screened, imputed
+
+provenancePriority = {unscreened: 0, imputed: 1, screened: 2} # a measured fitness is never overwritten by an imputed one
+
+def readExcelChunks(fileName, variantColumn, fitnessColumn, skipRows=0, chunkSize=10000):
+    # streams (variants, fitnesses) chunks from the first sheet of an xlsx file without loading the workbook into memory
+    import openpyxl
+    workbook = openpyxl.load_workbook(fileName, read_only=True, data_only=True)
+    try:
+        rows = workbook.worksheets[0].iter_rows(values_only=True)
+        header = list(next(rows))
+        yield from chunkRows(rows, header.index(variantColumn), header.index(fitnessColumn), skipRows, chunkSize)
+    finally:
+        workbook.close()
+
+def readCsvChunks(fileName, variantColumn, fitnessColumn, skipRows=0, chunkSize=10000):
+    # streams (variants, fitnesses) chunks from a csv file with a header row
+    with open(fileName, newline="") as csvFile:
+        rows = csv.reader(csvFile)
+        header = next(rows)
+        yield from chunkRows(rows, header.index(variantColumn), header.index(fitnessColumn), skipRows, chunkSize)
+
+def readParquetChunks(fileName, variantColumn, fitnessColumn, skipRows=0, chunkSize=10000):
+    # streams (variants, fitnesses) chunks from a parquet file, needs pyarrow
+    try:
+        import pyarrow.parquet as pq
+    except ImportError:
+        raise ImportError("reading parquet files requires pyarrow, install it with pip install pyarrow")
+    rowsSeen = 0
+    for batch in pq.ParquetFile(fileName).iter_batches(batch_size=chunkSize, columns=[variantColumn, fitnessColumn]):
+        start = max(skipRows - rowsSeen, 0) # rows of this batch that were already imported
+        rowsSeen += batch.num_rows
+        if start >= batch.num_rows:
+            continue
+        batch = batch.slice(start)
+        yield batch.column(0).to_pylist(), batch.column(1).to_numpy(zero_copy_only=False)
+
+def chunkRows(rows, variantIndex, fitnessIndex, skipRows, chunkSize):
+    # groups the VARIANTINDEX and FITNESSINDEX cells of ROWS into chunks of CHUNKSIZE, after skipping SKIPROWS already imported rows
+    variants = []
+    fitnesses = []
+    for rowNumber, row in enumerate(rows):
+        if rowNumber < skipRows:
+            continue
+        variants.append(row[variantIndex])
+        fitnesses.append(row[fitnessIndex])
+        if len(variants) == chunkSize:
+            yield variants, fitnesses
+            variants = []
+            fitnesses = []
+    if variants:
+        yield variants, fitnesses
+
+readers = {".xlsx": readExcelChunks, ".csv": readCsvChunks, ".parquet": readParquetChunks} # chunk reader of each supported file extension
+
+def importLandscape(arrayName, sources, siteCount=4, chunkSize=10000):
+    # streams the variant fitness tables in SOURCES into the dense landscape ARRAYNAME (.npy) and its provenance array, see ArrayLandscape
+    # SOURCES is a list of (fileName, variantColumn, fitnessColumn, provenance) with provenance landscapeStore.screened or landscapeStore.imputed
+    # each chunk is written to the memory mapped arrays in one indexed assignment, so memory use does not grow with the file size
+    # progress is recorded in ARRAYNAME.progress.json after every chunk, an interrupted import resumes from there when called again
+    progressName = arrayName + ".progress.json"
+    provenanceName = getProvenanceName(arrayName)
+    if os.path.exists(progressName) and os.path.exists(arrayName) and os.path.exists(provenanceName):
+        with open(progressName) as progressFile:
+            progress = json.load(progressFile)
+        fitness = np.load(arrayName, mmap_mode="r+")
+        provenance = np.load(provenanceName, mmap_mode="r+")
+        print("resuming import into {0}".format(arrayName))
+    else:
+        progress = {}
+        fitness = np.lib.format.open_memmap(arrayName, mode="w+", dtype=np.float64, shape=(len(aminoAcids) ** siteCount,))
+        fitness[:] = np.nan
+        provenance = np.lib.format.open_memmap(provenanceName, mode="w+", dtype=np.uint8, shape=fitness.shape)
+        provenance[:] = unscreened
+    priority = np.array([provenancePriority[code] for code in sorted(provenancePriority)]) # priority of each provenance code
+    for fileName, variantColumn, fitnessColumn, sourceProvenance in sources:
+        rowsDone = progress.get(fileName, 0)
+        reader = readers[os.path.splitext(fileName)[1].lower()]
+        print("importing {0} from row {1}".format(fileName, rowsDone))
+        for variants, values in reader(fileName, variantColumn, fitnessColumn, rowsDone, chunkSize):
+            rowsDone += len(variants)
+            values = np.array([np.nan if value is None or value == "" else float(value) for value in values], dtype=np.float64) # csv cells arrive as strings
+            present = np.array([isinstance(variant, str) and len(variant) == siteCount for variant in variants]) & ~np.isnan(values) # skip blank rows
+            indices = variantsToIndices([variant for variant, isPresent in zip(variants, present) if isPresent])
+            writable = priority[provenance[indices]] <= provenancePriority[sourceProvenance]
+            fitness[indices[writable]] = values[present][writable]
+            provenance[indices[writable]] = sourceProvenance
+            fitness.flush()
+            provenance.flush()
+            progress[fileName] = rowsDone
+            saveProgress(progressName, progress) # only after the chunk is on disk, rewriting a chunk after a crash is harmless
+            print("imported {0} rows of {1}".format(rowsDone, fileName))
+    del fitness, provenance
+    os.remove(progressName)
+    return arrayName
+
+def saveProgress(progressName, progress):
+    temporaryName = progressName + ".tmp"
+    with open(temporaryName, "w") as progressFile:
+        json.dump(progress, progressFile)
+    os.replace(temporaryName, progressName)
@@ -0,0 +1,168 @@
+import contextlib
+import cProfile
+import io
+import pstats
+import time
+from collections import OrderedDict
+
+missingVariant = object() # cached in place of the fitness of a variant that was not screened
+
+class InstrumentedLandscape:
+    # wraps a landscape shelve or array to account for the screening cost of each strategy, see SingleMutantWalk.instrument
+    # inside a replicate() block every lookup is memoized in a bounded LRU cache, so a variant looked up again in the same replicate is a repeat rather than a new screen
+    # counts per strategy the replicates, lookups, unique screens, repeats and unscreened variants, with the time spent in the wrapped landscape versus the whole replicate
+    def __init__(self, landscape, cacheSize=4096):
+        self.landscape = landscape # the wrapped landscape
+        self.cacheSize = cacheSize # variants remembered per replicate, screens are only counted exactly while a replicate stays below this
+        self.cache = OrderedDict()
+        self.strategy = None # strategy of the running replicate, lookups outside a replicate are not counted
+        self.stats = {} # strategy -> counters, see getStats
+        self.hooks = [] # functions called with (strategy, counters of the replicate) after every replicate
+
+    def __getattr__(self, name):
+        # siteCount, screenedIndices, lookupIndices and the rest of the wrapped landscape
+        return getattr(self.landscape, name)
+
+    def __getitem__(self, variant):
+        if self.strategy is None:
+            return self.landscape[variant]
+        counters = self.replicateCounters
+        counters["lookups"] += 1
+        if variant in self.cache:
+            counters["repeats"] += 1
+            self.cache.move_to_end(variant)
+            value = self.cache[variant]
+        else:
+            start = time.perf_counter()
+            try:
+                value = self.landscape[variant]
+                counters["screens"] += 1
+            except KeyError:
+                value = missingVariant
+                counters["missing"] += 1
+            counters["backendSeconds"] += time.perf_counter() - start
+            self.cache[variant] = value
+            if len(self.cache) > self.cacheSize:
+                self.cache.popitem(last=False)
+        if value is missingVariant:
+            raise KeyError(variant)
+        return value
+
+    def __contains__(self, variant):
+        return variant in self.landscape
+
+    def __len__(self):
+        return len(self.landscape)
+
+    def __iter__(self):
+        return iter(self.landscape)
+
+    def get(self, variant, default=None):
+        try:
+            return self[variant]
+        except KeyError:
+            return default
+
+    def keys(self):
+        return self.landscape.keys()
+
+    def values(self):
+        return self.landscape.values()
+
+    def items(self):
+        return self.landscape.items()
+
+    def close(self):
+        self.landscape.close()
+
+    @contextlib.contextmanager
+    def replicate(self, strategy):
+        # accounts the lookups of one replicate of STRATEGY, replicates nested in another one are counted as part of the outer one
+        if self.strategy is not None:
+            yield
+            return
+        self.cache.clear()
+        self.strategy = strategy
+        self.replicateCounters = newCounters()
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.replicateCounters["wallSeconds"] = time.perf_counter() - start
+            self.replicateCounters["replicates"] = 1
+            self.strategy = None
+            self.cache.clear()
+            self.addCounters(strategy, self.replicateCounters)
+
+    def recordScreens(self, screens, missing=0):
+        # counts SCREENS distinct variants screened by the running replicate without going through the landscape, e.g. a training set read from the solution vector
+        if self.strategy is not None:
+            self.replicateCounters["lookups"] += screens + missing
+            self.replicateCounters["screens"] += screens
+            self.replicateCounters["missing"] += missing
+
+    def recordBatch(self, strategy, replicates, lookups, screens, missing, seconds):
+        # accounts REPLICATES replicates of STRATEGY run together as array operations, which never go through __getitem__
+        counters = newCounters()
+        counters.update({"replicates": replicates, "lookups": lookups, "screens": screens, "repeats": lookups - screens - missing, "missing": missing, "wallSeconds": seconds})
+        self.addCounters(strategy, counters)
+
+    def addCounters(self, strategy, counters):
+        totals = self.stats.setdefault(strategy, newCounters())
+        for name, value in counters.items():
+            totals[name] += value
+        for hook in self.hooks:
+            hook(strategy, counters)
+
+    def addHook(self, hook):
+        # calls HOOK(strategy, counters) after every replicate, or batch of replicates, with that replicate's counters
+        self.hooks.append(hook)
+
+    def getStats(self):
+        # counters of every strategy with the screens per replicate and the time spent outside the landscape lookups
+        stats = {}
+        for strategy, totals in self.stats.items():
+            stats[strategy] = dict(totals)
+            stats[strategy]["screensPerReplicate"] = totals["screens"] / totals["replicates"] if totals["replicates"] else 0
+            stats[strategy]["overheadSeconds"] = totals["wallSeconds"] - totals["backendSeconds"]
+        return stats
+
+    def reset(self):
+        self.stats = {}
+
+    def report(self, strategy):
+        # prints the screening cost and time split of STRATEGY
+        stats = self.getStats().get(strategy)
+        if stats is None:
+            return
+        print("{0}: {1:.1f} unique screens per replicate over {2} replicates, {3} repeated and {4} unscreened lookups, {5:.3f} s in landscape lookups and {6:.3f} s elsewhere".format(
+            strategy, stats["screensPerReplicate"], stats["replicates"], stats["repeats"], stats["missing"], stats["backendSeconds"], stats["overheadSeconds"]))
+
+def newCounters():
+    return {"replicates": 0, "lookups": 0, "screens": 0, "repeats": 0, "missing": 0, "backendSeconds": 0.0, "wallSeconds": 0.0}
+
+@contextlib.contextmanager
+def profiled(sortBy="cumulative", limit=25, sampling=False):
+    # profiles the enclosed code and prints the top LIMIT entries, with cProfile or, if SAMPLING is set, the pyinstrument sampling profiler
+    if sampling:
+        try:
+            from pyinstrument import Profiler
+        except ImportError:
+            raise ImportError("sampling profiles require pyinstrument, install it with pip install pyinstrument")
+        profiler = Profiler()
+        profiler.start()
+        try:
+            yield profiler
+        finally:
+            profiler.stop()
+            print(profiler.output_text())
+        return
+    profiler = cProfile.Profile()
+    profiler.enable()
+    try:
+        yield profiler
+    finally:
+        profiler.disable()
+        output = io.StringIO()
+        pstats.Stats(profiler, stream=output).sort_stats(sortBy).print_stats(limit)
+        print(output.getvalue())
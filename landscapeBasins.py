@@ -0,0 +1,79 @@
+import numpy as np
+from landscapeStore import aminoAcids, loadOrBuildSidecar
+
+class LandscapeBasins:
+    # steepest ascent structure of a landscape: every variant's best single mutant neighbour, the local optima and the basin each variant drains into
+    # the climb moves to the fittest neighbour at any position until none is fitter, so its peaks are true local optima. SingleMutantWalk.runSingleWalk instead fixes
+    # each position once and can stop elsewhere, its final variants, peak counts and fraction reaching the maximum are not the ones computed here
+    # rows follow variantIndices, the sorted base 20 indices of the screened variants, and every pointer is a row number
+    def __init__(self, variantIndices, fitness, bestNeighbour, basin):
+        self.variantIndices = variantIndices # base 20 index of each variant
+        self.fitness = fitness # fitness of each variant
+        self.bestNeighbour = bestNeighbour # row of the fittest single mutant neighbour, the row itself for a local optimum
+        self.basin = basin # row of the local optimum reached by always moving to the best neighbour
+
+    @classmethod
+    def compute(cls, landscape, chunkSize=100000):
+        # builds the index for an ArrayLandscape or SparseLandscape in O(N * 20 * L) lookups, CHUNKSIZE variants at a time
+        variantIndices = np.asarray(landscape.screenedIndices, dtype=np.int64)
+        fitness = landscape.lookupIndices(variantIndices)
+        strides = len(aminoAcids) ** np.arange(landscape.siteCount - 1, -1, -1, dtype=np.int64)
+        mutations = np.arange(len(aminoAcids), dtype=np.int64)
+        bestNeighbour = np.arange(len(variantIndices)) # every variant starts out as its own best neighbour
+        for start in range(0, len(variantIndices), chunkSize):
+            chunk = variantIndices[start:start + chunkSize]
+            digits = (chunk[:, None] // strides) % len(aminoAcids)
+            neighbours = (chunk[:, None] - digits * strides)[:, :, None] + mutations * strides[:, None] # (variants, positions, amino acids), includes the variant itself
+            neighbours = neighbours.reshape(len(chunk), -1)
+            neighbourFitness = landscape.lookupIndices(neighbours)
+            neighbourFitness[np.isnan(neighbourFitness)] = -np.inf # unscreened neighbours are never moved to
+            best = neighbourFitness.argmax(axis=1) # first fittest neighbour in position then amino acid order
+            rows = np.arange(len(chunk))
+            improves = neighbourFitness[rows, best] > fitness[start:start + chunkSize] # only strictly fitter neighbours are moved to, so the pointers never cycle
+            bestNeighbour[start + rows[improves]] = np.searchsorted(variantIndices, neighbours[rows[improves], best[improves]])
+        basin = bestNeighbour.copy()
+        while True: # pointer jumping, every pass doubles the distance followed so this takes log2 of the longest climb passes
+            nextBasin = basin[basin]
+            if np.array_equal(nextBasin, basin):
+                break
+            basin = nextBasin
+        return cls(variantIndices, fitness, bestNeighbour, basin)
+
+    @classmethod
+    def load(cls, fileName):
+        with np.load(fileName) as data:
+            return cls(data["variantIndices"], data["fitness"], data["bestNeighbour"], data["basin"])
+
+    def save(self, fileName):
+        np.savez(fileName, **self.toArrays())
+
+    def toArrays(self):
+        return {"variantIndices": self.variantIndices, "fitness": self.fitness, "bestNeighbour": self.bestNeighbour, "basin": self.basin}
+
+    def getPeaks(self):
+        # rows of the local optima, variants with no strictly fitter single mutant neighbour
+        return np.flatnonzero(self.bestNeighbour == np.arange(len(self.bestNeighbour)))
+
+    def getNumberOfPeaks(self):
+        return len(self.getPeaks())
+
+    def getBasinSizes(self):
+        # number of variants draining into each peak, in the order of getPeaks()
+        return np.bincount(self.basin, minlength=len(self.basin))[self.getPeaks()]
+
+    def getFractionReachingMax(self, maxFitness=None):
+        # fraction of variants whose steepest ascent climb ends on the global maximum, or any peak of fitness MAXFITNESS
+        if maxFitness is None:
+            maxFitness = self.fitness.max()
+        return float(np.mean(self.fitness[self.basin] == maxFitness))
+
+    def getAverageFinalFitness(self):
+        # average fitness of the peak each variant's steepest ascent climb ends on
+        return float(self.fitness[self.basin].mean())
+
+def getLandscapeBasins(landscape, landscapeName=None):
+    # LandscapeBasins of LANDSCAPE, kept in a LANDSCAPENAME.basins.npz sidecar, see landscapeStore.loadOrBuildSidecar
+    # LANDSCAPE may be a function opening the landscape so it is only opened to build the index
+    def build():
+        return LandscapeBasins.compute(landscape() if callable(landscape) else landscape).toArrays()
+    return LandscapeBasins(**loadOrBuildSidecar(landscapeName, ".basins.npz", build))
@@ -0,0 +1,286 @@
+import os
+import shelve
+import numpy as np
+
+aminoAcids = ["A", "R", "N", "D", "C", "E", "Q", "G", "H", "I", "L", "K", "M", "F", "P", "S", "T", "W", "Y", "V"] # list of amino acid 1 letter codes, the order defines the base 20 digit of each amino acid
+aminoAcidIndex = {aa: digit for digit, aa in enumerate(aminoAcids)} # maps each amino acid to its base 20 digit
+unscreened, screened, imputed = 0, 1, 2 # provenance codes of a landscape entry, see getProvenanceName
+maxSiteCount = 14 # 20^14 is the largest power of 20 below 2^63, so variants of up to 14 sites pack into one int64 index
+
+def getSiteCount(landscapeSize):
+    # returns the number of mutated sites L of a dense landscape holding 20^L variants
+    siteCount = int(round(np.log(landscapeSize) / np.log(len(aminoAcids))))
+    if len(aminoAcids) ** siteCount != landscapeSize:
+        raise ValueError("a dense landscape must hold 20^L entries, got {0}".format(landscapeSize))
+    return siteCount
+
+def variantToIndex(variant):
+    # converts a variant such as "VDGV" into its base 20 index, the first position being the most significant digit
+    index = 0
+    for aa in variant:
+        try:
+            index = index * len(aminoAcids) + aminoAcidIndex[aa]
+        except KeyError:
+            raise KeyError(variant)
+    return index
+
+def indexToVariant(index, siteCount):
+    # converts a base 20 index back into its variant string
+    variant = []
+    for _ in range(siteCount):
+        index, digit = divmod(int(index), len(aminoAcids))
+        variant.append(aminoAcids[digit])
+    return "".join(reversed(variant))
+
+def variantsToIndices(variants):
+    # vectorized variantToIndex for a list of equal length variants
+    variants = np.asarray(variants, dtype="U")
+    if not variants.size:
+        return np.zeros(0, dtype=np.int64)
+    lookup = np.full(128, -1, dtype=np.int64) # ascii code -> base 20 digit
+    for aa, digit in aminoAcidIndex.items():
+        lookup[ord(aa)] = digit
+    characters = variants.view(np.uint32).reshape(len(variants), -1)
+    digits = lookup[np.minimum(characters, 127)]
+    if (digits < 0).any():
+        raise KeyError(variants[(digits < 0).any(axis=1)][0])
+    strides = len(aminoAcids) ** np.arange(digits.shape[1] - 1, -1, -1, dtype=np.int64)
+    return digits @ strides
+
+def indicesToVariants(indices, siteCount):
+    # vectorized indexToVariant, returns a list of variant strings
+    indices = np.asarray(indices, dtype=np.int64)
+    strides = len(aminoAcids) ** np.arange(siteCount - 1, -1, -1, dtype=np.int64)
+    digits = (indices[:, None] // strides) % len(aminoAcids)
+    letters = np.ascontiguousarray(np.array(aminoAcids)[digits]) # one U1 character per position
+    return letters.view("U{0}".format(siteCount)).reshape(-1).tolist() # reinterpret each row of characters as one string
+
+class IndexedLandscape:
+    # dict-like view shared by the integer indexed landscapes, so they can stand in for an open shelve in SingleMutantWalk
+    # subclasses provide self.siteCount, screenedIndices and lookupIndices()
+    def __getitem__(self, variant):
+        if len(variant) != self.siteCount:
+            raise KeyError(variant)
+        value = self.lookupIndices(np.array([variantToIndex(variant)]))[0]
+        if np.isnan(value): # in the case the given variant was not screened
+            raise KeyError(variant)
+        return float(value)
+
+    def __contains__(self, variant):
+        try:
+            self[variant]
+        except KeyError:
+            return False
+        return True
+
+    def __len__(self):
+        return len(self.screenedIndices)
+
+    def __iter__(self):
+        return iter(self.keys())
+
+    def get(self, variant, default=None):
+        try:
+            return self[variant]
+        except KeyError:
+            return default
+
+    def keys(self):
+        return indicesToVariants(self.screenedIndices, self.siteCount)
+
+    def values(self):
+        return self.lookupIndices(self.screenedIndices).tolist()
+
+    def items(self):
+        return zip(self.keys(), self.values())
+
+class ArrayLandscape(IndexedLandscape):
+    # dense landscape stored as a flat float array of 20^L fitness values indexed by base 20 variant index
+    # unscreened variants are stored as NaN and behave like missing shelve keys
+    def __init__(self, fitness, fileName=None):
+        self.fileName = fileName # name of the .npy file backing this landscape, None for an in memory landscape
+        self.fitness = fitness # flat array of fitness values, NaN for variants that were not screened
+        self.siteCount = getSiteCount(len(fitness)) # number of mutated positions in each variant
+        self._screenedIndices = None # indices of the screened variants, computed on first use
+
+    @classmethod
+    def load(cls, fileName, inMemory=False):
+        # opens a landscape saved with save() or convertShelveToArray(), memory mapped unless INMEMORY is set
+        fitness = np.load(fileName, mmap_mode=None if inMemory else "r")
+        return cls(fitness, fileName)
+
+    @classmethod
+    def fromMapping(cls, mapping, siteCount=None):
+        # builds an in memory landscape from any variant -> fitness mapping such as an open shelve
+        fitness = None
+        for variant, value in mapping.items():
+            if fitness is None:
+                siteCount = siteCount or len(variant)
+                fitness = np.full(len(aminoAcids) ** siteCount, np.nan)
+            fitness[variantToIndex(variant)] = value
+        if fitness is None:
+            raise ValueError("cannot build a landscape from an empty mapping")
+        return cls(fitness)
+
+    def save(self, fileName):
+        # writes the landscape to FILENAME as a .npy file
+        np.save(fileName, np.asarray(self.fitness))
+
+    def loadProvenance(self):
+        # returns whether each entry was unscreened, screened or imputed, as written by importLandscape, or None if that was not recorded
+        if self.fileName is None or not os.path.exists(getProvenanceName(self.fileName)):
+            return None
+        return np.load(getProvenanceName(self.fileName), mmap_mode="r")
+
+    @property
+    def screenedIndices(self):
+        # sorted indices of all the variants with a fitness value
+        if self._screenedIndices is None:
+            self._screenedIndices = np.flatnonzero(~np.isnan(self.fitness))
+        return self._screenedIndices
+
+    def lookupIndices(self, indices):
+        # gathers the fitness of an array of variant indices of any shape, NaN where the variant was not screened
+        return np.asarray(self.fitness[indices], dtype=np.float64)
+
+    def __getitem__(self, variant):
+        # direct scalar read, the hot path of getBestVariant and getBestVariantFromList
+        if len(variant) != self.siteCount:
+            raise KeyError(variant)
+        value = self.fitness[variantToIndex(variant)]
+        if np.isnan(value):
+            raise KeyError(variant)
+        return float(value)
+
+    def close(self):
+        # releases the memory map, the landscape can not be read afterwards
+        self.fitness = None
+        self._screenedIndices = None
+
+class SparseLandscape(IndexedLandscape):
+    # landscape holding only the screened variants as a sorted array of base 20 indices and their fitness values
+    # memory grows with the number of screened variants rather than with 20^L, for libraries of more than 4 or 5 sites
+    def __init__(self, indices, fitness, siteCount, fileName=None, isSorted=False):
+        # ISSORTED skips sorting, so INDICES and FITNESS are used without a copy, e.g. when they live in shared memory
+        if siteCount > maxSiteCount:
+            raise ValueError("at most {0} sites fit in a 64 bit variant index, got {1}".format(maxSiteCount, siteCount))
+        indices = np.asarray(indices, dtype=np.int64)
+        fitness = np.asarray(fitness, dtype=np.float64)
+        if not isSorted:
+            order = np.argsort(indices, kind="stable")
+            indices, fitness = indices[order], fitness[order]
+        self.fileName = fileName # name of the .npz file backing this landscape, None for an in memory landscape
+        self.screenedIndices = indices # sorted base 20 indices of the screened variants
+        self.fitness = fitness # fitness of each screened variant
+        self.siteCount = siteCount # number of mutated positions in each variant
+
+    @classmethod
+    def load(cls, fileName):
+        # opens a landscape saved with save()
+        with np.load(fileName) as data:
+            return cls(data["indices"], data["fitness"], int(data["siteCount"]), fileName)
+
+    @classmethod
+    def fromMapping(cls, mapping, siteCount=None):
+        # builds a sparse landscape from any variant -> fitness mapping such as an open shelve
+        variants = list(mapping.keys())
+        if not variants:
+            raise ValueError("cannot build a landscape from an empty mapping")
+        fitness = [mapping[variant] for variant in variants]
+        return cls(variantsToIndices(variants), fitness, siteCount or len(variants[0]))
+
+    def save(self, fileName):
+        # writes the landscape to FILENAME as a .npz file
+        np.savez(fileName, indices=self.screenedIndices, fitness=self.fitness, siteCount=self.siteCount)
+
+    def lookupIndices(self, indices):
+        # gathers the fitness of an array of variant indices of any shape by binary search, NaN where the variant was not screened
+        indices = np.asarray(indices, dtype=np.int64)
+        positions = np.minimum(np.searchsorted(self.screenedIndices, indices), len(self.screenedIndices) - 1)
+        return np.where(self.screenedIndices[positions] == indices, self.fitness[positions], np.nan)
+
+    def close(self):
+        self.screenedIndices = None
+        self.fitness = None
+
+def getProvenanceName(fileName):
+    # name of the uint8 array next to a dense landscape file recording the unscreened, screened or imputed provenance of each entry
+    return os.path.splitext(fileName)[0] + ".provenance.npy"
+
+def openLandscape(fileName):
+    # opens a .npy dense or .npz sparse landscape file
+    if fileName.endswith(".npz"):
+        return SparseLandscape.load(fileName)
+    return ArrayLandscape.load(fileName)
+
+def toIndexedLandscape(mapping, denseSiteLimit=5):
+    # copies any variant -> fitness mapping into a dense landscape, or a sparse one if the variants have more than DENSESITELIMIT sites
+    if isinstance(mapping, IndexedLandscape):
+        return mapping
+    siteCount = len(next(iter(mapping.keys())))
+    if siteCount > denseSiteLimit:
+        return SparseLandscape.fromMapping(mapping, siteCount)
+    return ArrayLandscape.fromMapping(mapping, siteCount)
+
+def convertShelveToArray(shelveName, arrayName):
+    # converts an existing shelve landscape such as GB1dataset_fitted into a .npy landscape readable by ArrayLandscape.load()
+    landscape = shelve.open(shelveName, flag="r")
+    try:
+        fitness = None
+        counter = 0
+        for variant, value in landscape.items():
+            if fitness is None:
+                fitness = np.lib.format.open_memmap(arrayName, mode="w+", dtype=np.float64, shape=(len(aminoAcids) ** len(variant),))
+                fitness[:] = np.nan
+            fitness[variantToIndex(variant)] = value
+            counter += 1
+            if not counter % 10000:
+                print("converted {0} out of {1} variants".format(counter, len(landscape)))
+        if fitness is None:
+            raise ValueError("shelve {0} is empty".format(shelveName))
+        fitness.flush()
+    finally:
+        landscape.close()
+    return arrayName
+
+def getModificationTime(landscapeName):
+    # latest modification time in nanoseconds of the files making up a landscape, a shelve spreads over several files, None if there are none
+    times = [os.stat(fileName).st_mtime_ns for fileName in (landscapeName, landscapeName + ".dat", landscapeName + ".dir", landscapeName + ".db") if os.path.exists(fileName)]
+    return max(times) if times else None
+
+def loadOrBuildSidecar(landscapeName, suffix, build):
+    # arrays cached in a LANDSCAPENAME + SUFFIX sidecar file, reused for as long as the landscape files keep their modification time, see getModificationTime
+    # BUILD returns a dictionary of arrays and is only called when the sidecar is missing or out of date, the sidecar is then rewritten atomically
+    # nothing is saved without a LANDSCAPENAME or for a landscape with no files
+    sourceTime = None if landscapeName is None else getModificationTime(landscapeName)
+    sidecarName = None if landscapeName is None else landscapeName + suffix
+    if sourceTime is not None and os.path.exists(sidecarName):
+        with np.load(sidecarName) as data:
+            if int(data["sourceTime"]) == sourceTime:
+                return {name: data[name] for name in data.files if name != "sourceTime"}
+    arrays = build()
+    if sourceTime is not None:
+        temporaryName = sidecarName + ".tmp.npz"
+        np.savez(temporaryName, sourceTime=sourceTime, **arrays)
+        os.replace(temporaryName, sidecarName)
+    return arrays
+
+def getLandscapeMetadata(landscape, landscapeName=None):
+    # returns the base 20 indices of the landscape variants in key order, their fitness values, the maximum fitness and the site count
+    # these are kept in a LANDSCAPENAME.meta.npz sidecar, see loadOrBuildSidecar, and LANDSCAPE may be a function opening the landscape so it is only opened to build it
+    def build():
+        openedLandscape = landscape() if callable(landscape) else landscape
+        if isinstance(openedLandscape, IndexedLandscape):
+            variantIndices = np.asarray(openedLandscape.screenedIndices)
+            fitness = openedLandscape.lookupIndices(variantIndices)
+            siteCount = openedLandscape.siteCount
+        else:
+            variants = list(openedLandscape.keys())
+            variantIndices = variantsToIndices(variants)
+            fitness = np.array(list(openedLandscape.values()), dtype=np.float64)
+            siteCount = len(variants[0])
+        return {"variantIndices": variantIndices, "fitness": fitness, "maxFitness": fitness.max(), "siteCount": siteCount}
+    metadata = loadOrBuildSidecar(landscapeName, ".meta.npz", build)
+    metadata["maxFitness"] = float(metadata["maxFitness"])
+    metadata["siteCount"] = int(metadata["siteCount"])
+    return metadata
@@ -0,0 +1,105 @@
+import multiprocessing
+from multiprocessing import shared_memory
+import numpy as np
+from landscapeStore import ArrayLandscape, SparseLandscape
+from SingleMutantWalk import SingleMutantWalk
+
+strategies = {
+    # maps a strategy name to the SingleMutantWalk method running one replicate of it, each takes variantList and rng keywords
+    "singleWalk": "runRandomSingleWalk",
+    "recombination": "runRecombination",
+    "randomSample": "runRandomSample",
+    "linearRegression": "runLinearRegression",
+}
+
+class SharedLandscape:
+    # copies an ArrayLandscape or SparseLandscape into shared memory blocks that worker processes attach to without copying
+    # use as a context manager so the blocks are freed once the simulations are done
+    def __init__(self, landscape):
+        if isinstance(landscape, SparseLandscape):
+            arrays = {"indices": landscape.screenedIndices, "fitness": landscape.fitness}
+        else:
+            arrays = {"fitness": np.asarray(landscape.fitness)}
+        self.blocks = [] # shared memory blocks owned by this process
+        self.description = {"sparse": isinstance(landscape, SparseLandscape), "siteCount": landscape.siteCount, "arrays": {}} # picklable recipe for attachLandscape()
+        for name, array in arrays.items():
+            block = shared_memory.SharedMemory(create=True, size=max(array.nbytes, 1))
+            np.ndarray(array.shape, dtype=array.dtype, buffer=block.buf)[:] = array
+            self.blocks.append(block)
+            self.description["arrays"][name] = (block.name, array.shape, array.dtype.str)
+
+    def close(self):
+        for block in self.blocks:
+            block.close()
+            block.unlink()
+        self.blocks = []
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+def attachLandscape(description):
+    # rebuilds a landscape over the shared memory blocks described by SharedLandscape.description, returns it with the blocks to keep alive
+    blocks = []
+    arrays = {}
+    for name, (blockName, shape, dtype) in description["arrays"].items():
+        block = shared_memory.SharedMemory(name=blockName)
+        blocks.append(block)
+        arrays[name] = np.ndarray(shape, dtype=np.dtype(dtype), buffer=block.buf)
+    if description["sparse"]:
+        landscape = SparseLandscape(arrays["indices"], arrays["fitness"], description["siteCount"], isSorted=True)
+    else:
+        landscape = ArrayLandscape(arrays["fitness"])
+    return landscape, blocks
+
+workerState = {} # per process SingleMutantWalk and variant list, set up once by initializeWorker
+
+def initializeWorker(description, aminoAcidDict):
+    # every worker encodes the data matrix with the parent's AMINOACIDDICT, so model strategies do not depend on which worker runs a replicate
+    landscape, blocks = attachLandscape(description)
+    workerState["blocks"] = blocks
+    workerState["walk"] = SingleMutantWalk(None, landscape=landscape, aminoAcidDict=aminoAcidDict)
+    workerState["variantList"] = workerState["walk"].variantList
+
+def runReplicate(task):
+    # runs replicate REPLICATE of STRATEGY with a generator seeded from its own SEEDSEQUENCE, so results do not depend on which worker runs it
+    replicate, strategy, seedSequence, strategyArgs = task
+    method = getattr(workerState["walk"], strategies[strategy])
+    result = method(*strategyArgs, variantList=workerState["variantList"], rng=np.random.default_rng(seedSequence))
+    return replicate, result
+
+def runReplicates(landscape, strategy, timesToRun, strategyArgs=(), seed=None, processes=None, chunkSize=8, aminoAcidDict=None):
+    # runs TIMESTORUN replicates of STRATEGY (a key of strategies) over a process pool sharing LANDSCAPE, an ArrayLandscape or SparseLandscape
+    # STRATEGYARGS are passed before the keywords, e.g. (470, 100) for linearRegression
+    # yields (replicate, (best variant, best fitness)) as replicates finish, in completion order
+    # replicate i always draws from the i-th child of SEED and every worker uses the same AMINOACIDDICT, by default the seeded one of SingleMutantWalk,
+    # so a given seed reproduces the same results at any number of PROCESSES, see checkReproducible
+    if strategy not in strategies:
+        raise ValueError("unknown strategy {0}, expected one of {1}".format(strategy, sorted(strategies)))
+    if aminoAcidDict is None:
+        aminoAcidDict = SingleMutantWalk(None, landscape=landscape).aminoAcidDict
+    seedSequences = np.random.SeedSequence(seed).spawn(timesToRun)
+    tasks = ((replicate, strategy, seedSequence, tuple(strategyArgs)) for replicate, seedSequence in enumerate(seedSequences))
+    with SharedLandscape(landscape) as sharedLandscape:
+        with multiprocessing.Pool(processes, initializer=initializeWorker, initargs=(sharedLandscape.description, aminoAcidDict)) as pool:
+            for replicate, result in pool.imap_unordered(runReplicate, tasks, chunksize=chunkSize):
+                yield replicate, result
+
+def sampleParallel(landscape, strategy, timesToRun, strategyArgs=(), seed=None, processes=None):
+    # average best fitness of TIMESTORUN replicates of STRATEGY, see runReplicates
+    print("Running {0} strategy {1} times in parallel".format(strategy, timesToRun))
+    total = 0
+    counter = 0
+    for _, (_, peakFitness) in runReplicates(landscape, strategy, timesToRun, strategyArgs, seed, processes):
+        total += peakFitness
+        counter += 1
+        if not counter % 100:
+            print("Completed {0} out of {1} {2} simulations".format(counter, timesToRun, strategy))
+    return total / counter
+
+def checkReproducible(landscape, strategy, timesToRun, strategyArgs=(), seed=0, processCounts=(1, 3), runs=2):
+    # runs the same seeded replicates RUNS times for every number of processes in PROCESSCOUNTS, returns whether every replicate gave the same result each time
+    results = [sorted(runReplicates(landscape, strategy, timesToRun, strategyArgs, seed, processes)) for processes in processCounts for _ in range(runs)]
+    return all(result == results[0] for result in results[1:])
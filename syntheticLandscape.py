@@ -0,0 +1,56 @@
+import numpy as np
+from landscapeStore import aminoAcids, ArrayLandscape, SparseLandscape
+
+# seeded synthetic landscapes for benchmarking and testing the strategies without the GB1 data files
+# fitness values lie in [0, 1], so the -1 used for unscreened variants in getBestVariant stays below every real variant
+
+def getDigits(indices, siteCount):
+    strides = len(aminoAcids) ** np.arange(siteCount - 1, -1, -1, dtype=np.int64)
+    return (indices[:, None] // strides) % len(aminoAcids)
+
+def chooseIndices(siteCount, variantCount, rng):
+    # every variant of the library, or VARIANTCOUNT distinct random ones
+    if variantCount is None:
+        return np.arange(len(aminoAcids) ** siteCount, dtype=np.int64)
+    return np.sort(rng.choice(len(aminoAcids) ** siteCount, variantCount, replace=False))
+
+def toLandscape(indices, fitness, siteCount, dense):
+    if dense:
+        values = np.full(len(aminoAcids) ** siteCount, np.nan)
+        values[indices] = fitness
+        return ArrayLandscape(values)
+    return SparseLandscape(indices, fitness, siteCount, isSorted=True)
+
+def makeNKLandscape(siteCount=4, interactions=1, seed=0, screenedFraction=1.0, variantCount=None, chunkSize=1000000):
+    # Kauffman NK landscape over 20 amino acids: each site contributes a random value depending on its own amino acid and those of INTERACTIONS other sites
+    # fitness is the mean contribution. SCREENEDFRACTION of the variants keep a fitness, the rest are left unscreened like the GB1 gaps
+    # with VARIANTCOUNT set only that many random variants are generated and a SparseLandscape is returned, for libraries too large to enumerate
+    rng = np.random.default_rng(seed)
+    neighbourhoods = [np.concatenate([[site], rng.choice(np.delete(np.arange(siteCount), site), interactions, replace=False)]) for site in range(siteCount)] # sites each contribution depends on
+    contributions = rng.random((siteCount, len(aminoAcids) ** (interactions + 1))) # contribution table of each site
+    strides = len(aminoAcids) ** np.arange(interactions, -1, -1, dtype=np.int64)
+    indices = chooseIndices(siteCount, variantCount, rng)
+    fitness = np.empty(len(indices))
+    for start in range(0, len(indices), chunkSize):
+        digits = getDigits(indices[start:start + chunkSize], siteCount)
+        fitness[start:start + chunkSize] = np.mean([contributions[site][digits[:, neighbourhood] @ strides] for site, neighbourhood in enumerate(neighbourhoods)], axis=0)
+    keep = rng.random(len(indices)) < screenedFraction
+    return toLandscape(indices[keep], fitness[keep], siteCount, variantCount is None)
+
+def makeAdditiveLandscape(siteCount=4, epistasis=0.5, seed=0, screenedFraction=1.0, variantCount=None, chunkSize=1000000):
+    # independent per site amino acid effects plus pairwise epistatic effects scaled by EPISTASIS, squashed into [0, 1] with a logistic function
+    # SCREENEDFRACTION and VARIANTCOUNT as in makeNKLandscape
+    rng = np.random.default_rng(seed)
+    additive = rng.normal(size=(siteCount, len(aminoAcids)))
+    pairs = [(first, second) for first in range(siteCount) for second in range(first + 1, siteCount)]
+    pairwise = rng.normal(scale=epistasis, size=(len(pairs), len(aminoAcids), len(aminoAcids)))
+    indices = chooseIndices(siteCount, variantCount, rng)
+    fitness = np.empty(len(indices))
+    for start in range(0, len(indices), chunkSize):
+        digits = getDigits(indices[start:start + chunkSize], siteCount)
+        score = additive[np.arange(siteCount), digits].sum(axis=1)
+        for pair, (first, second) in enumerate(pairs):
+            score += pairwise[pair, digits[:, first], digits[:, second]]
+        fitness[start:start + chunkSize] = 1 / (1 + np.exp(-score / np.sqrt(siteCount)))
+    keep = rng.random(len(indices)) < screenedFraction
+    return toLandscape(indices[keep], fitness[keep], siteCount, variantCount is None)